@@ -0,0 +1,260 @@
+"""
+Benchmarks
+
+Times every pricing hot path at production sizes on the local Data files and
+records peak memory, in the spirit of asv: each benchmark is a setup that
+returns a callable, timed with timeit (best and median of several repeats)
+and run once more under tracemalloc for its peak allocation.
+
+Results are saved as JSON in the Benchmarks folder, one file per run label
+(the current git commit by default), so versions can be compared:
+
+    python benchmarks.py                         # run all, save Benchmarks/<commit>.json
+    python benchmarks.py -k tree                 # only names containing "tree"
+    python benchmarks.py --compare base.json     # ratios against a saved run
+
+"""
+import os
+import json
+import time
+import timeit
+import argparse
+import platform
+import subprocess
+import tracemalloc
+import numpy as np
+import pandas as pd
+# Custom modules
+import mortgage_cash_flow as mbs
+import z_spread as zs
+import spot_rate_bootstrap as srb
+import rate_model_engine as rm
+import monte_carlo_pricing as mc
+import curve_store as cs
+import kernels as kn
+
+RESULTS = "Benchmarks"
+SETTLE  = "3/8/2024"
+
+# Registered benchmarks: name -> setup returning the callable to time
+BENCHMARKS = {}
+
+
+def benchmark(name):
+
+    """
+    Register a benchmark setup under a name.
+    """
+
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+
+    return register
+
+
+def pool_cash_flow():
+    return mbs.cash_flow(SETTLE, 6.0, 358, 360, 358, 0, 54, 10, "CPR", 1_000_000)
+
+
+def zcbs(n):
+    return cs.open_store().lookup("zcb", SETTLE)[None, :n]
+
+
+@benchmark("cash_flow_360")
+def bench_cash_flow():
+    return pool_cash_flow
+
+
+@benchmark("wal_360")
+def bench_wal():
+    cf = pool_cash_flow()
+    return lambda: mbs.wal(SETTLE, cf)
+
+
+def pricing(typ, solve):
+
+    store = cs.open_store()
+    curve = store.curve("monthly", SETTLE) if typ == "Z" else store.frame("par", SETTLE)
+    cf    = pool_cash_flow()
+
+    if solve:
+        px = zs.price(cf, curve, SETTLE, 120, typ)
+        return lambda: zs.spread(cf, curve, SETTLE, px, typ)
+
+    return lambda: zs.price(cf, curve, SETTLE, 120, typ)
+
+
+for typ in ("Z", "I"):
+
+    def bench_price(typ=typ):
+        return pricing(typ, False)
+
+    def bench_spread(typ=typ):
+        return pricing(typ, True)
+
+    benchmark(f"price_{typ}")(bench_price)
+    benchmark(f"spread_{typ}")(bench_spread)
+
+
+@benchmark("spot_rate_bootstrap_all_dates")
+def bench_bootstrap():
+
+    tsy  = pd.read_csv(os.path.join("Data", "daily-treasury-rates.csv"))
+    head = pd.read_csv(os.path.join("Data", "daily-treasury-spot-header.csv"))
+    ylds = srb.interpolate_yields(tsy, head)
+
+    return lambda: srb.spot_rate_bootstrap(ylds, tsy, head)
+
+
+for steps in (60, 120, 360):
+
+    def bench_build(steps=steps):
+        zeros = zcbs(steps)
+        return lambda: rm.build(zeros, 0.01, 1/12)
+
+    benchmark(f"build_{steps}")(bench_build)
+
+
+@benchmark("priceTree_360")
+def bench_price_tree():
+
+    cal  = rm.build(zcbs(360), 0.01, 1/12)
+    tree = rm.rateTree(cal[0], cal[2], 0.01, 1/12, "HL")
+    cf   = rm.cf_bond(tree, 0, 1/12, 100, 5.0)
+
+    return lambda: rm.priceTree(tree, 1/2, cf, 1/12, "bond", 100)
+
+
+for paths in (1_000, 10_000):
+
+    def bench_monte_carlo(paths=paths):
+        cal  = rm.build(zcbs(360), 0.01, 1/12)
+        tree = rm.rateTree(cal[0], cal[2], 0.01, 1/12, "HL")
+        return lambda: mc.tree_monte_carlo(tree, paths, seed=1)
+
+    benchmark(f"tree_monte_carlo_{paths//1000}k")(bench_monte_carlo)
+
+
+def measure(func, repeat=5, budget=0.2) -> dict:
+
+    """
+    Time func with timeit and record its peak traced memory.
+
+    The loop count is chosen so one repeat takes about budget seconds.
+    """
+
+    timer  = timeit.Timer(func)
+    number = max(1, int(budget/max(timer.timeit(1), 1e-9)))
+    times  = np.array(timer.repeat(repeat=repeat, number=number))/number
+
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {"min"     : float(times.min()),
+            "median"  : float(np.median(times)),
+            "mean"    : float(times.mean()),
+            "number"  : number,
+            "repeat"  : repeat,
+            "peak_kb" : peak/1024}
+
+
+def label() -> str:
+
+    """
+    Current git commit (short hash), or a timestamp outside a git checkout.
+    """
+
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True)
+        if out.returncode == 0:
+            return out.stdout.strip()
+    except OSError:
+        pass
+
+    return time.strftime("%Y%m%d-%H%M%S")
+
+
+def run(names=None, repeat=5, budget=0.2) -> dict:
+
+    """
+    Run the registered benchmarks (all, or those in names).
+    """
+
+    results = {}
+
+    for name, setup in BENCHMARKS.items():
+
+        if names is not None and name not in names:
+            continue
+
+        results[name] = measure(setup(), repeat, budget)
+        print(f"{name:32s} {results[name]['median']*1e3:10.3f} ms {results[name]['peak_kb']:12.1f} KB")
+
+    return results
+
+
+def save(results, name=None, path=RESULTS) -> str:
+
+    """
+    Persist results with the run environment as JSON.
+    """
+
+    name = name or label()
+    file = os.path.join(path, f"{name}.json")
+
+    os.makedirs(path, exist_ok=True)
+
+    with open(file, "w") as f:
+        json.dump({"label"   : name,
+                   "created" : time.strftime("%Y-%m-%d %H:%M:%S"),
+                   "python"  : platform.python_version(),
+                   "numpy"   : np.__version__,
+                   "machine" : platform.machine(),
+                   "backend" : kn.BACKEND if kn.enabled() else "numpy",
+                   "results" : results}, f, indent=2)
+
+    return file
+
+
+def compare(base, results) -> pd.DataFrame:
+
+    """
+    Median times of a run against a saved baseline (ratio > 1 is slower).
+    """
+
+    if isinstance(base, str):
+        with open(base) as f:
+            base = json.load(f)["results"]
+
+    names = [n for n in results if n in base]
+    table = pd.DataFrame({"base_ms"  : [base[n]["median"]*1e3 for n in names],
+                          "new_ms"   : [results[n]["median"]*1e3 for n in names],
+                          "base_kb"  : [base[n]["peak_kb"] for n in names],
+                          "new_kb"   : [results[n]["peak_kb"] for n in names]}, index=names)
+    table["ratio"] = table["new_ms"]/table["base_ms"]
+
+    return table
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Pricing engine benchmarks")
+    parser.add_argument("-k", dest="match", help="only benchmarks whose name contains this")
+    parser.add_argument("--label", help="result file name (default: git commit)")
+    parser.add_argument("--compare", help="saved result file to compare against")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=0.2, help="seconds per repeat")
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    names   = None if args.match is None else [n for n in BENCHMARKS if args.match in n]
+    results = run(names, args.repeat, args.budget)
+
+    if not args.no_save:
+        print("saved", save(results, args.label))
+
+    if args.compare:
+        print(compare(args.compare, results).round(3).to_string())
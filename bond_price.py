@@ -1,81 +1,220 @@
-import numpy as np
-
-# ticking and unticking bonds for fixed income pricing purposes
-
-def tick(px):
-  
-    # round eighths to nearest eighth (matches Bloomberg calculations)
-    # if negative >> make positive and then add back the negative sign at the end 
-  
-  sign = 1
-  
-  if px < 0: 
-    px  = abs(px)
-    sign = -1
-  
-  handle  = np.trunc(px)
-  decimal = px - handle 
-  ticks   = np.trunc(decimal/(1/32))
-  eighths = np.round_((decimal/(1/32)-ticks)*8, decimals=0)
-
-  if eighths >= 8:
-    ticks   = ticks + 1
-    eighths = '' 
-
-  elif eighths == 4:
-    eighths = '+'  
-
-  elif eighths == 0: 
-    eighths = ''
-
-  else:
-    eighths = str('{:0.0f}'.format(eighths))  
-  
-  if ticks >= 32:
-    handle = handle + 1
-    ticks = '00'
-
-  elif ticks == 0:
-    ticks = '00' 
-
-  elif ticks < 10:
-    ticks = '0' + str('{:0.0f}'.format(ticks))
-
-  else:
-    ticks = str('{:0.0f}'.format(ticks))
-
-  return str('{:0.0f}'.format(sign*handle) + '-' + ticks + eighths)  
-
-
-def untick(px):
-  
-  try:
-    x = int(px)
-    return px
-  
-  except:
-    print('here')
-    index = px.find("-")
-    
-    if index == -1: 
-      return float(px)
-
-    index = px.find("-")
-    handle = int(px[:index])
-    ticks  = px[index+1:len(px)]
-
-    eights = 0
-    
-    if len(ticks) == 3: 
-      eighths = ticks[-1:]
-      ticks   = ticks[:len(ticks)-1]
-    
-    if eighths == '+': 
-      eighths = 4
-    print(ticks)
-    ticks = int(ticks)/32
-    eighths = int(eighths)/8*1/32
-    
-    return  handle + ticks + eighths 
-
-
+"""
+Bond Price Quotes - 32nds
+
+Ticking and unticking bonds for fixed income pricing purposes. Quotes are a
+handle and 32nds with an optional eighth of a 32nd (matches Bloomberg):
+
+    99-16   -> 99 + 16/32
+    99-16+  -> 99 + 16/32 + 4/256
+    99-162  -> 99 + 16/32 + 2/256
+
+Prices are rounded to the nearest 1/256 (an eighth of a 32nd) as integer
+units, so ticks carry into the handle exactly. Every conversion has a scalar
+version (tick, untick) and an array version (tick_array, untick_array) for
+NumPy arrays or pandas Series, and read_quotes streams large quote files in
+chunks with the prices already in decimal.
+
+"""
+import re
+import numpy as np
+import pandas as pd
+
+# Eighths of a 32nd as quoted ('+' is a half)
+EIGHTHS = np.array(["", "1", "2", "3", "+", "5", "6", "7"])
+
+# Ticks and eighths of every 1/256 within a point
+SUFFIX = np.array([f"-{u//8:02d}{EIGHTHS[u % 8]}" for u in range(256)])
+
+# Handle-ticks[eighth] quotes, optionally signed
+QUOTE = r"^\s*(-?)(\d+)-(\d{2})([0-7+]?)\s*$"
+
+# Quote file lines parsed per chunk
+CHUNK = 100_000
+
+
+def tick(px) -> str:
+
+    """
+    Decimal price to a 32nds quote (nearest eighth of a 32nd).
+    """
+
+    units = int(np.rint(abs(px)*256))
+    sign  = "-" if px < 0 and units else ""
+
+    return f"{sign}{units//256}{SUFFIX[units % 256]}"
+
+
+def untick(px) -> float:
+
+    """
+    32nds quote (or plain decimal price) to a decimal price.
+    """
+
+    if not isinstance(px, str):
+        return float(px)
+
+    parts = re.match(QUOTE, px)
+
+    if parts is None:
+        return float(px)
+
+    sign, handle, ticks, eighths = parts.groups()
+    eighths = "4" if eighths == "+" else eighths or "0"
+
+    if int(ticks) >= 32:
+        raise ValueError(f"Invalid 32nds quote: {px!r}")
+
+    return (-1 if sign else 1)*(int(handle) + int(ticks)/32 + int(eighths)/256)
+
+
+def tick_array(px):
+
+    """
+    Decimal prices (array or Series) to 32nds quotes; NaN prices give ''.
+
+    Only the distinct handles are formatted; ticks and eighths come from
+    the table of all 256 suffixes.
+    """
+
+    values = np.asarray(px, dtype=float)
+    valid  = np.isfinite(values)
+    units  = np.rint(np.abs(np.where(valid, values, 0))*256).astype(np.int64)
+
+    uniq, inv = np.unique(units//256, return_inverse=True)
+    handle = np.array([str(h) for h in uniq])[inv.reshape(units.shape)]
+    quotes = np.char.add(handle, SUFFIX[units % 256])
+    quotes = np.where((values < 0) & (units > 0), np.char.add("-", quotes), quotes)
+    quotes = np.where(valid, quotes, "")
+
+    if isinstance(px, pd.Series):
+        return pd.Series(quotes, index=px.index, name=px.name)
+
+    return quotes
+
+
+def untick_array(quotes, errors="raise"):
+
+    """
+    32nds quotes or decimal prices (array or Series of strings) to decimal
+    prices. Blank quotes give NaN; other unparseable quotes raise, or give
+    NaN with errors='coerce'.
+
+    Quotes are parsed as a matrix of character codes (one row per quote), 
+    so handle, ticks and eighths are read with array arithmetic.
+    """
+
+    text  = np.char.strip(np.asarray(quotes, dtype=str).ravel())
+    width = max(text.dtype.itemsize//4, 1)
+    C     = np.ascontiguousarray(text).view(np.uint32).reshape(len(text), -1) if len(text) \
+            else np.zeros((0, width), dtype=np.uint32)
+    C     = np.hstack((C, np.zeros((len(C), 4), dtype=np.uint32)))   # room past the end
+    rows  = np.arange(len(C))
+
+    digit = lambda c: (c >= ord("0")) & (c <= ord("9"))
+    size  = (C != 0).sum(axis=1)
+    sign  = C[:, 0] == ord("-")
+    expo  = np.logical_or.accumulate((C == ord("e")) | (C == ord("E")), axis=1)
+
+    # Tick separator: a dash right after a digit with no exponent before it
+    dash  = C == ord("-")
+    dash[:, 1:] &= digit(C[:, :-1]) & ~expo[:, :-1]
+    dash[:, 0] = False
+    quote = dash.any(axis=1)
+    d     = dash.argmax(axis=1)
+    tail  = size - d - 1
+    at    = lambda k: C[rows, d + k].astype(np.int64)
+
+    # Handle digits between the sign and the dash
+    handle = np.zeros(len(C))
+    valid  = d > sign
+
+    for j in range(width):
+        span    = (j >= sign) & (j < d)
+        handle  = np.where(span, handle*10 + C[:, j].astype(np.int64) - ord("0"), handle)
+        valid  &= ~span | digit(C[:, j])
+
+    t1, t2, last = at(1), at(2), at(3)
+    ticks  = (t1 - ord("0"))*10 + t2 - ord("0")
+    eighth = np.where(tail == 3, np.where(last == ord("+"), 4, last - ord("0")), 0)
+    valid &= digit(t1) & digit(t2) & (ticks < 32) & ((tail == 2) | ((tail == 3) & \
+             ((last == ord("+")) | ((last >= ord("0")) & (last <= ord("7"))))))
+
+    out    = np.where(sign, -1.0, 1.0)*(handle + ticks/32 + eighth/256)
+    out    = np.where(quote & valid, out, np.nan)
+
+    # Plain decimal prices
+    plain  = ~quote
+
+    try:
+        out[plain] = text[plain].astype(float)
+    except ValueError:
+        out[plain] = pd.to_numeric(pd.Series(text[plain]), errors="coerce").to_numpy(dtype=float)
+
+    bad = ~np.isfinite(out) & (size > 0)
+
+    if errors == "raise" and bad.any():
+        raise ValueError(f"Invalid price quotes: {[str(t) for t in text[bad][:5]]}")
+
+    out[bad] = np.nan
+    out      = out.reshape(np.shape(quotes))
+
+    if isinstance(quotes, pd.Series):
+        return pd.Series(out, index=quotes.index, name=quotes.name)
+
+    return out
+
+
+def read_quotes(file, columns=("Price",), chunksize=CHUNK, errors="coerce", **kw):
+
+    """
+    Stream a quote file in chunks with price columns in decimal.
+
+    Parameters
+    ------------
+    file      : path or buffer of a delimited quote file (pandas.read_csv)
+    columns   : price columns quoted in 32nds or decimal
+    chunksize : lines per chunk
+    errors    : 'coerce' turns bad quotes into NaN, 'raise' stops the read
+    kw        : passed to pandas.read_csv (sep, usecols, ...)
+
+    Yields dataframes of at most chunksize lines.
+
+    """
+
+    reader = pd.read_csv(file, chunksize=chunksize, dtype={c: str for c in columns}, \
+                         keep_default_na=False, **kw)
+
+    for chunk in reader:
+
+        for c in columns:
+            chunk[c] = untick_array(chunk[c], errors)
+
+        yield chunk
+
+
+# Unit testing
+if __name__ == "__main__":
+
+    import io
+    import time
+
+    for p in (99.5, 99.515625, 100.0078125, 99.998, -0.5, 101.1):
+        print(p, tick(p), untick(tick(p)))
+
+    print(untick("99-16+"), untick("99-162"), untick("99-16"), untick("99.5"), untick(100))
+
+    # Scalar and array conversions agree, including signed and exponent decimals
+    cases = ["99-16+", "-99-16", "99-162", " 99-16 ", "99.5", "-0.5", "1e-5", "1E-5", "-2.5e-3", "3e+2"]
+    assert np.array_equal(untick_array(cases), [untick(c) for c in cases])
+
+    rng    = np.random.default_rng(1)
+    prices = np.round(rng.uniform(80, 110, 500_000)*256)/256
+    start  = time.time()
+    quotes = tick_array(prices)
+    back   = untick_array(quotes)
+    print(f"{len(prices)} quotes round trip {time.time() - start:.2f}s, max error {np.max(np.abs(back - prices))}")
+    assert all(q == tick(p) for q, p in zip(quotes[:2000], prices[:2000]))
+
+    text = "Id,Price\n" + "\n".join(f"{i % 7},{q}" for i, q in enumerate(quotes))
+    rows = sum(len(c) for c in read_quotes(io.StringIO(text)))
+    print(rows, "lines streamed")
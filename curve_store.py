@@ -0,0 +1,225 @@
+"""
+Curve Store
+
+Binary columnar store for curve histories. Each curve set is persisted as a
+contiguous float64 dates x tenors matrix plus a sorted datetime64 date index
+and a tenor index (.npy files). Files are memory-mapped on open, so lookups
+return zero-copy views and worker processes share the same pages instead of
+each parsing csv.
+
+Curve sets converted from the Data folder:
+    par     -> semi-annual interpolated par yields  (ylds-semi-annual.csv)
+    spots   -> semi-annual spot rates               (spots-semi-annual.csv)
+    monthly -> monthly spot rates                   (spots-monthly.csv)
+    zcb     -> monthly zero coupon bond prices from the monthly spot rates
+
+"""
+import os
+import datetime
+import numpy as np
+import pandas as pd
+# Custom modules
+import discount_curve as dc
+
+# Source csv for each curve set
+SOURCES = {"par"     : "ylds-semi-annual.csv",
+           "spots"   : "spots-semi-annual.csv",
+           "monthly" : "spots-monthly.csv"}
+
+
+class CurveStore:
+
+    """
+    Memory-mapped curve store.
+
+    Parameters
+    ------------
+    path : store directory
+    mmap : memory-map the curve matrices (False loads them into memory)
+
+    """
+
+    def __init__(self, path, mmap=True):
+
+        self.path   = path
+        self.mmap   = mmap
+        self._sets  = {}
+
+    def names(self) -> list:
+
+        """
+        Curve sets available in the store.
+        """
+
+        return sorted(f[:-len("-dates.npy")] for f in os.listdir(self.path) \
+                      if f.endswith("-dates.npy"))
+
+    def load(self, name):
+
+        """
+        Dates, tenors and rates for a curve set (memory-mapped, cached).
+        """
+
+        if name not in self._sets:
+
+            base  = os.path.join(self.path, name)
+            mode  = "r" if self.mmap else None
+            dates = np.load(base + "-dates.npy", mmap_mode=mode)
+            tens  = np.load(base + "-tenors.npy")
+            rates = np.load(base + ".npy", mmap_mode=mode)
+
+            self._sets[name] = (dates, tens, rates)
+
+        return self._sets[name]
+
+    def write(self, name, dates, tenors, rates):
+
+        """
+        Persist a curve set, sorted by date.
+        """
+
+        dates = np.asarray(dates, dtype="datetime64[D]")
+        order = np.argsort(dates, kind="stable")
+        base  = os.path.join(self.path, name)
+
+        os.makedirs(self.path, exist_ok=True)
+        np.save(base + "-dates.npy", dates[order])
+        np.save(base + "-tenors.npy", np.asarray(tenors, dtype=float))
+        np.save(base + ".npy", np.ascontiguousarray(np.asarray(rates, dtype=float)[order]))
+
+        self._sets.pop(name, None)
+
+    def index(self, name, date) -> int:
+
+        """
+        Row of a curve date - O(log n) binary search.
+        """
+
+        dates = self.load(name)[0]
+        date  = to_date(date)
+        row   = np.searchsorted(dates, date)
+
+        if row == len(dates) or dates[row] != date:
+            raise KeyError(f"No {name} curve for {date}")
+
+        return int(row)
+
+    def lookup(self, name, date) -> np.ndarray:
+
+        """
+        Rates of one curve date as a zero-copy view.
+        """
+
+        return self.load(name)[2][self.index(name, date)]
+
+    def range(self, name, start, end):
+
+        """
+        Dates and rates for start <= date <= end as zero-copy views.
+        """
+
+        dates, tenors, rates = self.load(name)
+        lo = np.searchsorted(dates, to_date(start), side="left")
+        hi = np.searchsorted(dates, to_date(end), side="right")
+
+        return (dates[lo:hi], rates[lo:hi])
+
+    def tenors(self, name) -> np.ndarray:
+        return self.load(name)[1]
+
+    def frame(self, name, date) -> pd.DataFrame:
+
+        """
+        One curve date as the single-row dataframe used by the pricing engine.
+        """
+
+        cols = [int(t) for t in self.tenors(name)]
+
+        return pd.DataFrame(self.lookup(name, date)[None, :], columns=cols)
+
+    def curve(self, name, date) -> dc.Curve:
+
+        """
+        One curve date as a discount_curve.Curve.
+        """
+
+        return dc.Curve(self.tenors(name), self.lookup(name, date), to_date(date))
+
+
+def to_date(date) -> np.datetime64:
+
+    """
+    m/d/yyyy strings, timestamps or datetime64 to datetime64[D].
+    """
+
+    if isinstance(date, str):
+        date = datetime.datetime.strptime(date, "%m/%d/%Y")
+
+    return np.datetime64(date, "D")
+
+
+def convert(data="Data", path=os.path.join("Data", "store")) -> CurveStore:
+
+    """
+    Convert the csv curve files in the Data folder into a curve store.
+    """
+
+    store = CurveStore(path)
+
+    for name, file in SOURCES.items():
+
+        frame  = pd.read_csv(os.path.join(data, file))
+        dates  = pd.to_datetime(frame["Date"], format="%m/%d/%Y").values
+        tenors = np.array(frame.columns[1:], dtype=float)
+        rates  = np.array(frame.iloc[:, 1:], dtype=float)
+
+        store.write(name, dates, tenors, rates)
+
+        # Zero coupon bond prices, monthly compounding as in the pricing engine
+        if name == "monthly":
+            store.write("zcb", dates, tenors, (1+rates/(12*100))**-tenors)
+
+    return store
+
+
+def open_store(path=os.path.join("Data", "store"), data="Data") -> CurveStore:
+
+    """
+    Open the curve store, converting the Data folder on first use and
+    again whenever a source csv has changed since the store was built.
+    """
+
+    if stale(path, data):
+        return convert(data, path)
+
+    return CurveStore(path)
+
+
+def stale(path=os.path.join("Data", "store"), data="Data") -> bool:
+
+    """
+    True when the store is missing or older than any source csv.
+    """
+
+    built = os.path.join(path, "zcb-dates.npy")     # written last by convert
+
+    if not os.path.exists(built):
+        return True
+
+    sources = [os.path.join(data, f) for f in SOURCES.values()]
+
+    return any(os.path.getmtime(f) > os.path.getmtime(built) for f in sources if os.path.exists(f))
+
+
+# Unit Testing
+if __name__ == "__main__":
+
+    store = open_store()
+
+    z_curve     = store.frame("monthly", "3/8/2024")
+    zeros       = store.lookup("zcb", "3/8/2024")
+    dates, ylds = store.range("par", "1/2/2024", "3/8/2024")
+
+    print(store.names())
+    print(z_curve.iloc[0, 0:5].values)
+    print(len(dates), ylds.shape)
@@ -0,0 +1,132 @@
+"""
+Discount Curve
+
+Compact curve object built once per curve date and shared across pricing
+calls. Holds tenors, rates and log discount factors as NumPy arrays and
+caches spread-shifted discount factors.
+
+Conventions follow the pricing engine: rates are in percent, point k of the
+curve discounts the cash flow in month index k with monthly compounding, and
+tenors (the curve column labels, in months) are used for interpolation.
+
+"""
+import hashlib
+from collections import OrderedDict
+import numpy as np
+
+# Shared discount factor cache keyed by (curve date, curve digest, spread)
+CACHE_SIZE = 1024
+_cache     = OrderedDict()
+
+
+class Curve:
+
+    """
+    Yield or spot rate curve for a single date.
+
+    Parameters
+    ------------
+    tenors : curve tenors in months
+    rates  : curve rates (%)
+    date   : curve date, used in cache keys
+
+    """
+
+    def __init__(self, tenors, rates, date=None):
+
+        self.tenors = np.asarray(tenors, dtype=float)
+        self.rates  = np.asarray(rates, dtype=float).ravel()
+        self.date   = date
+        self.months = np.arange(len(self.rates))
+        self.log_df = -self.months*np.log1p(self.rates/(12*100))
+        self.key    = (date, hashlib.sha1(self.rates.tobytes()).hexdigest())
+
+        self.rates.flags.writeable  = False
+        self.log_df.flags.writeable = False
+
+    @classmethod
+    def from_frame(cls, frame, date=None):
+
+        """
+        Build a curve from a curve dataframe.
+
+        Accepts a single-row curve (as used by the pricing engine) or a
+        multi-date history with a Date column, selecting the given date.
+
+        """
+
+        if "Date" in frame.columns:
+            if date is not None:
+                frame = frame.loc[frame["Date"] == date]
+            date  = frame["Date"].iloc[0]
+            frame = frame.drop("Date", axis=1)
+
+        return cls(frame.columns.values.astype(int), frame.iloc[0].values, date)
+
+    def __len__(self):
+        return len(self.rates)
+
+    def spots(self, n=None) -> np.ndarray:
+
+        """
+        Curve rates for the first n cash flow months.
+        """
+
+        return self.rates[:n]
+
+    def discount(self, spread=0, n=None) -> np.ndarray:
+
+        """
+        Spread-shifted discount factors for the first n months.
+
+        Results are cached by (curve date, spread) in a shared LRU cache.
+
+        """
+
+        key = self.key + (float(spread),)
+
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key][:n]
+
+        if spread == 0:
+            zcb = np.exp(self.log_df)
+        else:
+            zcb = 1/((1+(self.rates + spread/100)/(12*100))**self.months)
+
+        zcb.flags.writeable = False
+        _cache[key] = zcb
+
+        if len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+        return zcb[:n]
+
+    def interp(self, tenor):
+
+        """
+        Linearly interpolated curve rate at tenor(s) in months.
+        """
+
+        return np.interp(tenor, self.tenors, self.rates)
+
+
+def as_curve(curve) -> Curve:
+
+    """
+    Accept a Curve or a single-row curve dataframe.
+    """
+
+    if isinstance(curve, Curve):
+        return curve
+
+    return Curve.from_frame(curve)
+
+
+def clear_cache():
+
+    """
+    Drop all cached discount factors.
+    """
+
+    _cache.clear()
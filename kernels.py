@@ -0,0 +1,360 @@
+"""
+Compiled Kernels
+
+Optional Numba backend for the recursions at the core of the pricing engine:
+
+    rollback       -> binomial backward induction (rate_model_engine.rollback)
+    build_forward  -> Ho-Lee forward induction (rate_model_engine.build_forward)
+    build_bdt      -> BDT forward induction (rate_model_engine.build_bdt)
+    amortize       -> mortgage amortization (mortgage_cash_flow.amortize)
+    bootstrap      -> par to spot bootstrap (spot_rate_bootstrap.bootstrap)
+
+Kernels are plain scalar loops compiled with numba.njit when Numba is
+installed. The backend is chosen at runtime: the KERNEL_BACKEND environment
+variable (numba or numpy) sets the default, set_backend switches it, and
+without Numba every call stays on the NumPy implementations. The engine
+modules check enabled() and hand their arrays to these kernels.
+
+Without Numba the kernels still run as (slow) pure Python, which is how the
+equivalence checks below compare the two backends anywhere.
+
+"""
+import os
+import math
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA = True
+
+except ImportError:
+    NUMBA = False
+
+    def njit(*args, **kwargs):
+
+        # No-op decorator: kernels run as plain Python
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+
+        return lambda func: func
+
+
+BACKEND = os.environ.get("KERNEL_BACKEND", "numba" if NUMBA else "numpy")
+
+
+def set_backend(name):
+
+    """
+    Select the kernel backend (numba or numpy).
+    """
+
+    global BACKEND
+
+    if name == "numba" and not NUMBA:
+        raise ImportError("Numba is not installed")
+
+    if name not in ("numba", "numpy"):
+        raise ValueError(f"Unknown kernel backend: {name}")
+
+    BACKEND = name
+
+
+def enabled() -> bool:
+
+    """
+    True when the compiled kernels are in use.
+    """
+
+    return NUMBA and BACKEND == "numba"
+
+
+@njit(cache=True)
+def rollback(disc, cf, terminal):
+
+    """
+    Backward induction over a stack of cash flow trees.
+
+    disc     : N+1 x N+1 one-step discount tree
+    cf       : K x N+1 x N+1 cash flow trees
+    terminal : K terminal values
+    """
+
+    k = cf.shape[0]
+    n = disc.shape[1]
+    tree = np.zeros((k, n, n))
+
+    for s in range(k):
+
+        for row in range(n):
+            tree[s, row, n-1] = terminal[s]
+
+        for col in range(n-2, -1, -1):
+            for row in range(col+1):
+                up   = tree[s, row, col+1] + cf[s, row, col+1]
+                down = tree[s, row+1, col+1] + cf[s, row+1, col+1]
+                tree[s, row, col] = disc[row, col]*(0.5*up + 0.5*down)
+
+    return tree
+
+
+@njit(cache=True)
+def build_forward(zcb, vol, delta):
+
+    """
+    Ho-Lee forward induction on state prices.
+
+    zcb : N zero coupon bond prices
+    vol : N per-period volatilities times sqrt(delta)
+
+    Returns the rate tree and theta.
+    """
+
+    n     = zcb.shape[0]
+    tree  = np.zeros((n+1, n+1))
+    theta = np.zeros(n)
+    state = np.zeros(n+1)
+    prev  = np.zeros(n+1)
+
+    tree[0, 0] = -math.log(zcb[0])/delta
+    state[0]   = 1.0
+
+    for i in range(1, n):
+
+        prev[:i] = state[:i]
+        state[:i+1] = 0.0
+
+        for j in range(i):
+            parent = prev[j]*math.exp(-tree[j, i-1]*delta)
+            state[j]   += 0.5*parent
+            state[j+1] += 0.5*parent
+
+        top   = tree[0, i-1] + vol[i]
+        total = 0.0
+
+        for j in range(i+1):
+            total += state[j]*math.exp(-(top - 2*vol[i]*j)*delta)
+
+        theta[i] = math.log(total/zcb[i])/delta**2
+
+        for j in range(i+1):
+            tree[j, i] = top - 2*vol[i]*j + theta[i]*delta
+
+    return tree, theta
+
+
+@njit(cache=True)
+def build_bdt(zcb, vol, delta, tol, miter):
+
+    """
+    Black-Derman-Toy forward induction with a Newton solve per column.
+
+    zcb : N zero coupon bond prices
+    vol : N per-period volatilities times sqrt(delta)
+
+    Returns the rate tree and the median rates.
+    """
+
+    n     = zcb.shape[0]
+    tree  = np.zeros((n+1, n+1))
+    theta = np.zeros(n)
+    state = np.zeros(n+1)
+    prev  = np.zeros(n+1)
+    shape = np.zeros(n+1)
+
+    tree[0, 0] = -math.log(zcb[0])/delta
+    theta[0]   = tree[0, 0]
+    state[0]   = 1.0
+
+    for i in range(1, n):
+
+        prev[:i] = state[:i]
+        state[:i+1] = 0.0
+
+        for j in range(i):
+            parent = prev[j]*math.exp(-tree[j, i-1]*delta)
+            state[j]   += 0.5*parent
+            state[j+1] += 0.5*parent
+
+        for j in range(i+1):
+            shape[j] = math.exp(vol[i]*(i - 2*j))
+
+        u = theta[i-1]
+
+        for k in range(miter):
+
+            f  = 0.0
+            f1 = 0.0
+
+            for j in range(i+1):
+                node = state[j]*math.exp(-u*shape[j]*delta)
+                f   += node
+                f1  -= node*shape[j]*delta
+
+            step = (f - zcb[i])/f1
+            u    = u - step
+
+            if abs(step) < tol:
+                break
+
+        theta[i] = u
+
+        for j in range(i+1):
+            tree[j, i] = u*shape[j]
+
+    return tree, theta
+
+
+@njit(cache=True, error_model="numpy")
+def amortize(cpn, wam, balloon, io, smm, bal):
+
+    """
+    Mortgage amortization month by month.
+
+    Pool terms are R-vectors and smm is R x M (M the longest balloon).
+    Mirrors the closed form: the starting balance is the balance times the
+    running product of monthly survival factors.
+
+    Returns starting balance, interest, scheduled principal, unscheduled
+    principal, cash flow and ending balance as R x M arrays.
+    """
+
+    rows, months = smm.shape
+    start     = np.zeros((rows, months))
+    interest  = np.zeros((rows, months))
+    principal = np.zeros((rows, months))
+    prepay    = np.zeros((rows, months))
+    flow      = np.zeros((rows, months))
+    ending    = np.zeros((rows, months))
+
+    # Scheduled fractions (-1 past the balloon), reused while rows share terms
+    sched = np.zeros(months)
+    last  = np.full(4, np.nan)
+
+    for r in range(rows):
+
+        rate = 30/360*cpn[r]/100
+
+        if not (cpn[r] == last[0] and wam[r] == last[1] and balloon[r] == last[2] and io[r] == last[3]):
+
+            for m in range(months):
+
+                period = m + 1
+
+                if period > balloon[r]:
+                    sched[m] = -1.0
+                elif period < io[r] + 1:
+                    sched[m] = 0.0
+                elif period == balloon[r]:
+                    sched[m] = 1.0
+                else:
+                    remain   = wam[r] - (period - 1)
+                    sched[m] = 1/remain if rate == 0 else rate/((1+rate)**remain - 1)
+
+            last[0], last[1], last[2], last[3] = cpn[r], wam[r], balloon[r], io[r]
+
+        survive = 1.0
+
+        for m in range(months):
+
+            if sched[m] < 0:
+                break
+
+            # No prepayment once the balloon pays off the balance
+            speed = 0.0 if (m + 1 == balloon[r] and m + 1 >= io[r] + 1) else smm[r, m]
+
+            start[r, m]     = bal[r]*survive
+            interest[r, m]  = rate*start[r, m]
+            principal[r, m] = sched[m]*start[r, m]
+            prepay[r, m]    = speed*(start[r, m] - principal[r, m])
+            ending[r, m]    = start[r, m] - principal[r, m] - prepay[r, m]
+            flow[r, m]      = interest[r, m] + principal[r, m] + prepay[r, m]
+
+            survive = survive*((1 - sched[m])*(1 - speed))
+
+    return start, interest, principal, prepay, flow, ending
+
+
+@njit(cache=True)
+def bootstrap(par, short):
+
+    """
+    Semi-annual par to spot bootstrap, one date (row) at a time.
+    """
+
+    face  = 100.0
+    delta = 0.5
+    dates, tenors = par.shape
+    spots = np.zeros((dates, tenors))
+
+    for d in range(dates):
+
+        zcb_sum = 0.0
+
+        for col in range(3):
+            spots[d, col] = short[d, col]
+
+        for col in range(1, 3):
+            zcb_sum += 1/((1+spots[d, col]/100*delta)**col)
+
+        for col in range(3, tenors):
+
+            cpn    = par[d, col]
+            int_cf = cpn/100*delta*face*zcb_sum
+            zero   = ((face + face*cpn/100*delta)/(face - int_cf))**(1/col)
+
+            spots[d, col] = (zero-1)*2*100
+            zcb_sum      += 1/((1+spots[d, col]/100*delta)**col)
+
+    return spots
+
+
+# Equivalence checks - compiled kernels against the NumPy implementations
+if __name__ == "__main__":
+
+    import rate_model_engine as rm
+    import mortgage_cash_flow as mbs
+    import spot_rate_bootstrap as srb
+    import prepayment as prepay
+    import curve_store as cs
+
+    store = cs.open_store()
+    zeros = store.lookup("zcb", "3/8/2024")[None, :60]
+    vols  = np.linspace(0.012, 0.008, 60)
+
+    def check(name, a, b, tol=1e-12):
+        err = max(float(np.max(np.abs(np.asarray(x) - np.asarray(y))/np.maximum(1, np.abs(y)))) \
+                  for x, y in zip(a, b))
+        assert err < tol, f"{name}: backends differ by {err}"
+        print(f"{name:14s} max diff {err:.2e}")
+
+    set_backend("numpy")
+
+    hl  = rm.build_forward(zeros, vols, 1/12)
+    bdt = rm.build_bdt(zeros, vols/0.05, 1/12)
+    cf  = rm.cf_cap(hl[1], [4.0, 5.0], 1/12, 100, 0)
+    px  = rm.rollback(rm.discountTree(hl[1], 1/12), cf, 0)
+
+    wam  = np.array([358, 300, 240, 120, 60.0])
+    io   = np.array([0, 12, 0, 0, 24.0])
+    smm  = prepay.smm_vector(np.linspace(5, 25, 5)[:, None], "CPR", 358)
+    pool = mbs.amortize(6.0, wam, wam, io, smm, 1e6)
+
+    tsy   = np.array(store.range("par", "1/2/2024", "3/8/2024")[1])
+    short = tsy[:, 0:3]
+    spots = srb.bootstrap(tsy, short)
+    vol   = vols*np.sqrt(1/12)
+
+    check("build_forward", hl[1:], build_forward(zeros[0], vol, 1/12))
+    check("build_bdt", bdt[1:], build_bdt(zeros[0], vol/0.05, 1/12, 1e-14, 50))
+    check("rollback", [px], [rollback(rm.discountTree(hl[1], 1/12), cf, np.zeros(2))])
+    check("amortize", pool, amortize(np.full(5, 6.0), wam, wam, io, smm, np.full(5, 1e6)))
+    check("bootstrap", [spots], [bootstrap(tsy, short)])
+
+    if NUMBA:
+
+        set_backend("numba")
+
+        check("engine", [hl[1], bdt[1], px, spots, pool[4]], \
+              [rm.build_forward(zeros, vols, 1/12)[1], rm.build_bdt(zeros, vols/0.05, 1/12)[1], \
+               rm.rollback(rm.discountTree(hl[1], 1/12), cf, 0), srb.bootstrap(tsy, short), \
+               mbs.amortize(6.0, wam, wam, io, smm, 1e6)[4]])
@@ -0,0 +1,211 @@
+"""
+Packed Triangular Lattice
+
+Compact storage for recombining trees. A tree with N+1 columns only uses
+the upper triangle of an N+1 x N+1 matrix (column c has c+1 nodes), so the
+nodes are stored column by column in one flat buffer of (N+1)(N+2)/2 values,
+about half the dense size. Rate, probability, cash flow and price trees all
+share this layout; leading axes of the buffer hold stacks of trees.
+
+"""
+import math
+import numpy as np
+
+
+class Lattice:
+
+    """
+    Recombining tree stored as a packed triangular buffer.
+
+    Parameters
+    ------------
+    size  : number of columns (N+1 for an N step tree)
+    data  : packed buffer (..., size*(size+1)/2), zeros if not given
+    dtype : buffer type (bool for node masks)
+
+    """
+
+    def __init__(self, size, data=None, dtype=float):
+
+        self.size = size
+
+        if data is None:
+            data = np.zeros(size*(size+1)//2)
+
+        self.data = np.asarray(data, dtype=dtype)
+
+    @staticmethod
+    def offset(col) -> int:
+
+        """
+        Position of the first node of a column in the buffer.
+        """
+
+        return col*(col+1)//2
+
+    def index(self, row, col) -> int:
+
+        """
+        Position of node (row, col) in the buffer.
+        """
+
+        return self.offset(col) + row
+
+    def column(self, col) -> np.ndarray:
+
+        """
+        Nodes of a column as a view into the buffer.
+        """
+
+        start = self.offset(col)
+
+        return self.data[..., start:start+col+1]
+
+    def __getitem__(self, node):
+
+        row, col = node
+
+        return self.data[..., self.index(row, col)]
+
+    def __setitem__(self, node, value):
+
+        row, col = node
+        self.data[..., self.index(row, col)] = value
+
+    @property
+    def shape(self):
+        return self.data.shape[:-1] + (self.size, self.size)
+
+    @property
+    def nbytes(self) -> int:
+        return self.data.nbytes
+
+    def to_dense(self) -> np.ndarray:
+
+        """
+        Expand to the dense N+1 x N+1 (upper triangular) layout.
+        """
+
+        dense = np.zeros(self.shape)
+        rows, cols = triangle(self.size)
+        dense[..., rows, cols] = self.data
+
+        return dense
+
+    @classmethod
+    def from_dense(cls, tree):
+
+        """
+        Pack a dense tree (or stack of trees) into a lattice.
+        """
+
+        tree = np.asarray(tree, dtype=float)
+        rows, cols = triangle(tree.shape[-1])
+
+        return cls(tree.shape[-1], tree[..., rows, cols])
+
+
+def triangle(size):
+
+    """
+    Row and column indices of the packed nodes in buffer order.
+    """
+
+    cols = np.repeat(np.arange(size), np.arange(1, size+1))
+    rows = np.arange(len(cols)) - cols*(cols+1)//2
+
+    return (rows, cols)
+
+
+def rate_lattice(r0, theta, sigma, delta) -> Lattice:
+
+    """
+    Ho-Lee rate tree (as built by rateTree) in packed storage.
+    """
+
+    size  = len(theta)+1
+    rates = Lattice(size)
+    rates[0, 0] = r0
+
+    for col in range(1, size-1):
+        rates.column(col)[:] = ho_lee_column(r0, theta, sigma, delta, col)
+
+    return rates
+
+
+def prob_lattice(size, p=0.5) -> Lattice:
+
+    """
+    Up/down probability tree in packed storage.
+    """
+
+    return Lattice(size, np.full(size*(size+1)//2, p))
+
+
+def ho_lee_column(r0, theta, sigma, delta, col) -> np.ndarray:
+
+    """
+    Rates of one Ho-Lee tree column generated directly from theta
+    (sigma may be a scalar or one volatility per period).
+    """
+
+    vol = np.broadcast_to(np.asarray(sigma, dtype=float), (len(theta),))*math.sqrt(delta)
+    top = r0 + np.sum(np.asarray(theta)[1:col+1])*delta + np.sum(vol[1:col+1])
+
+    return top - 2*vol[col]*np.arange(col+1)
+
+
+def rollback(rates, cf, delta, terminal) -> Lattice:
+
+    """
+    Backward induction over packed trees.
+
+    rates    : rate lattice
+    cf       : cash flow lattice (buffer may hold a stack of trees)
+    terminal : value in the last column
+
+    Returns the price lattice.
+    """
+
+    size  = rates.size
+    price = Lattice(size, np.zeros(cf.data.shape))
+    price.column(size-1)[:] = np.asarray(terminal, dtype=float)[..., None]
+
+    pu = pd = 1/2
+
+    for col in reversed(range(0, size-1)):
+
+        value = price.column(col+1) + cf.column(col+1)
+        disc  = np.exp(-1*rates.column(col)*delta)
+        price.column(col)[:] = disc*(pu*value[..., :col+1] + pd*value[..., 1:])
+
+    return price
+
+
+# Unit testing
+if __name__ == "__main__":
+
+    import curve_store as cs
+    import rate_model_engine as rm
+
+    store = cs.open_store()
+    zeros = store.lookup("zcb", "3/8/2024")[None, :360]
+
+    for model in ("HL", "BDT"):
+
+        r0, dense, theta = rm.build(zeros, 0.009, 1/12, model=model)
+        packed = rm.rateTree(r0, theta, 0.009, 1/12, model, packed=True)
+
+        # Cash flows built and priced in packed storage against the dense tree
+        for name, cf, typ in (("bond", rm.cf_bond, "bond"), ("cap", rm.cf_cap, "cap"), ("floor", rm.cf_floor, "floor")):
+
+            strike = np.array([3.0, 4.0, 5.0])
+            p, _   = rm.priceTree(dense, 1/2, cf(dense, strike, 1/12, 100, strike), 1/12, typ, 100)
+            q, px  = rm.priceTree(packed, 1/2, cf(packed, strike, 1/12, 100, strike), 1/12, typ, 100)
+            mixed  = rm.priceTree(packed, 1/2, cf(dense, strike, 1/12, 100, strike), 1/12, typ, 100)[0]
+
+            assert isinstance(px, rm.lt.Lattice)
+            assert np.allclose(p, q, atol=1e-10) and np.allclose(p, mixed, atol=1e-10)
+            print(model, name, q, np.max(np.abs(p - q)))
+
+    print(f"packed {packed.nbytes:,} bytes, dense {dense.nbytes:,} bytes")
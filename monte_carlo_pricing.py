@@ -1,104 +1,207 @@
-# -*- coding: utf-8 -*-
-"""
-Monte Carlo - Rate Models
-
-"""
-
-import sys
-import os
-import math 
-import pandas as pd
-import numpy as np
-from numpy import random
-import matplotlib.pyplot as plt
-from scipy.optimize import newton
-# Custom module
-import rate_model_engine as model
-
-# Monte carlo simluation 
-def tree_monte_carlo(tree, paths):    
-    # return a dataframe
-    # same rows as the rate tree, columns is the number of simulations
-    monte = np.zeros([len(tree)-1, paths])
-
-    monte[0,:] = tree[0,0] # assign initial interest rate then simulate
-    
-    # initialize 
-
-    # the first 
-    # return monte
-    # the array is 48 cells 
-    
-    for col in range(0,monte.shape[1]):
-        
-        r = 0
-        c = 0
-        p = 0
-        
-        for row in range(1, monte.shape[0]):
-        
-            p = random.rand()
-            
-            if p > 0.5:
-                # move through rate tree
-                monte[row, col] = tree[r, c+1]
-                # update position on rate tree
-                r = r 
-                c = c+1
-            else:
-                # move through rate tree
-                monte[row, col] = tree[r+1, c+1]
-                # update position on rate tree
-                r = r + 1
-                c = c + 1
-
-    
-    periods = np.arange(1, len(tree), 1)
-    monte   = pd.DataFrame(monte)
-    monte.insert(0, 'Period', periods)
-    
-    return monte
-
-# Charting        
-def chart_monte_carlo(monte, spots, w, l):
-    
-    x1 = np.array(monte['Period'])
-    s1 = np.array(spots[0,:]/100)
-    fig,ax = plt.subplots(figsize=(w,l))
-    ax.set_xticks(np.arange(1, len(monte)+10, 20))
-    ax.set_yticks(np.arange(round(np.min(monte.iloc[:,1:].values)-0.50,2), round(np.max(monte.iloc[:,1:].values)+.50,2), 0.02))
-    
-  
-    for col in range(1, monte.shape[1]):
-        
-        y = np.array(monte.iloc[:, col])
-        plt.plot(x1, y, color="grey")
-    
-    plt.plot(x1, s1, color="blue", label="Spot Rates")
-    plt.legend(loc='upper right', fontsize='large')   
-        
-if __name__ == "__main__":
-
-    # Read in zero coupon data 
-    zero_coupons = pd.read_csv('https://raw.githubusercontent.com/wrcarpenter/Interest-Rate-Models/main/Data/zcbs.csv')
-    spot_rates   = pd.read_csv("https://raw.githubusercontent.com/wrcarpenter/Interest-Rate-Models/main/Data/spots-monthly.csv", header=0)
-    zcbs  = zero_coupons.loc[zero_coupons['Date']=='3/8/2024']
-    spots = spot_rates.loc[spot_rates['Date']=='3/8/2024']
-    zcbs = zcbs.drop("Date", axis=1)
-    spots = spots.drop("Date", axis=1)
-    
-    zeros  = np.array(zcbs.iloc[:,0:120])
-    spots  = np.array(spots.iloc[:,0:120])
-    cal    = model.build(zeros, 0.012, 1/12)
-    tree   = model.rateTree(cal[0], cal[2], 0.012, 1/12, 'HL')
-    cf     = model.cf_bond(tree, 5.00, 1/12, 1, 4.00)
-    out    = model.priceTree(tree, 1/2, cf, 1/12, bond, 1)
-    px     = out[0]
-    ptree  = out[1]
-
-
-    monte  = tree_monte_carlo(tree, 250)
-    chart_monte_carlo(monte, spots, 10, 5)                 
-        
-
+# -*- coding: utf-8 -*-
+"""
+Monte Carlo - Rate Models
+
+"""
+
+import sys
+import os
+import math 
+import pandas as pd
+import numpy as np
+from numpy import random
+import matplotlib.pyplot as plt
+from scipy.optimize import newton
+from scipy.special import ndtri
+from scipy.stats import qmc
+# Custom module
+import rate_model_engine as model
+import short_rate_models as srm
+import lattice as lt
+import curve_store as cs
+
+# Monte carlo simluation 
+def tree_monte_carlo(tree, paths, seed=None, method="random", antithetic=False, 
+                     bridge=True, frame=True):    
+    
+    '''
+    Simulate short rate paths through a recombining rate tree.
+    
+    All up/down moves are drawn at once as a (periods x paths) array, the 
+    cumulative sum of down moves gives each path's tree row and rates are 
+    gathered with fancy indexing one period at a time (a contiguous row of 
+    paths per period).
+    
+    Parameters
+    ------------
+    tree       : N+1 x N+1 rate tree, packed lattice.Lattice or a 
+                 short_rate_models.Binomial lattice (trinomial lattices 
+                 branch differently and are rejected)
+    paths      : number of simulated paths (a power of two for balanced 
+                 Sobol points)
+    seed       : seed for numpy.random.Generator (or the Sobol scrambling)
+    method     : random -> pseudo-random moves
+                 sobol  -> scrambled Sobol moves
+    antithetic : second half of the paths mirrors every move of the first
+    bridge     : order Sobol dimensions by Brownian bridge construction
+    frame      : return a dataframe with a Period column, else an array
+    
+    Returns rates with the same rows as the rate tree (less the last) and 
+    one column per path.
+    '''
+    
+    tree  = binomial_rates(tree)
+    steps = len(tree)-2
+    
+    down  = moves(steps, paths, seed, method, antithetic, bridge)
+    cols  = np.ascontiguousarray(tree.T)
+    rows  = np.zeros(paths, dtype=np.intp)
+    monte = np.empty([steps+1, paths])
+    
+    monte[0, :] = tree[0,0] # assign initial interest rate then simulate
+    
+    # running sum of down moves is the tree row of every path
+    for col in range(1, steps+1):
+        rows += down[col-1]
+        cols[col].take(rows, out=monte[col])
+    
+    if not frame:
+        return monte
+    
+    periods = np.arange(1, len(tree), 1)
+    monte   = pd.DataFrame(monte)
+    monte.insert(0, 'Period', periods)
+    
+    return monte
+
+
+def binomial_rates(tree) -> np.ndarray:
+    
+    '''
+    Dense rates of a binomial tree; TypeError for any other lattice.
+    '''
+    
+    if isinstance(tree, srm.Binomial):
+        return tree.rates
+    
+    if isinstance(tree, lt.Lattice):
+        return tree.to_dense()
+    
+    if isinstance(tree, np.ndarray) and tree.ndim == 2 and tree.shape[0] == tree.shape[1]:
+        return tree
+    
+    raise TypeError(f"Monte Carlo paths need a binomial rate tree, got {type(tree).__name__}")
+
+
+def moves(steps, paths, seed=None, method="random", antithetic=False, bridge=True):
+    
+    '''
+    Down moves (True) through the tree as a (steps x paths) boolean array.
+    
+    Up and down each have probability 1/2, so pseudo-random moves are 
+    random bits. Sobol moves are down when the uniform draw is at most 1/2 
+    - or, with a Brownian bridge, when the bridged increment is negative.
+    '''
+    
+    draws = paths - paths//2 if antithetic else paths
+    
+    if method == "random":
+        rng  = np.random.default_rng(seed)
+        bits = rng.integers(0, 256, (steps, (draws+7)//8), dtype=np.uint8)
+        down = np.unpackbits(bits, axis=1, count=draws).view(bool)
+    
+    elif method == "sobol":
+        
+        # Sobol points come in balanced blocks of 2^m; other counts take the
+        # leading points of the next block
+        sobol = qmc.Sobol(d=max(steps, 1), scramble=True, seed=seed)
+        u     = sobol.random_base2(int(np.ceil(np.log2(max(draws, 1)))))[:draws, :steps].T
+        
+        if bridge:
+            down = np.diff(brownian_bridge(ndtri(u)), axis=0, prepend=0) < 0
+        else:
+            down = u <= 0.5
+    
+    else:
+        raise ValueError(f"Unknown sampling method: {method}")
+    
+    if antithetic:
+        down = np.concatenate((down, ~down[:, :paths//2]), axis=1)
+    
+    return down
+
+
+def brownian_bridge(z):
+    
+    '''
+    Brownian motion at times 1..m from standard normals (m x paths).
+    
+    The first row fixes the terminal value and each later row fills the 
+    midpoint of the widest remaining gap, so the leading (best distributed) 
+    Sobol dimensions drive the coarse shape of every path.
+    '''
+    
+    m = z.shape[0]
+    w = np.zeros((m+1,) + z.shape[1:])
+    
+    w[m] = math.sqrt(m)*z[0]
+    
+    gaps = [(0, m)]
+    k    = 1
+    
+    while gaps:
+        
+        left, right = gaps.pop(0)
+        
+        if right - left < 2:
+            continue
+        
+        mid    = (left + right)//2
+        a, b   = mid - left, right - mid
+        w[mid] = (b*w[left] + a*w[right])/(a + b) + math.sqrt(a*b/(a + b))*z[k]
+        k     += 1
+        
+        gaps  += [(left, mid), (mid, right)]
+    
+    return w[1:]
+
+# Charting        
+def chart_monte_carlo(monte, spots, w, l):
+    
+    x1 = np.array(monte['Period'])
+    s1 = np.array(spots[0,:]/100)
+    fig,ax = plt.subplots(figsize=(w,l))
+    ax.set_xticks(np.arange(1, len(monte)+10, 20))
+    ax.set_yticks(np.arange(round(np.min(monte.iloc[:,1:].values)-0.50,2), round(np.max(monte.iloc[:,1:].values)+.50,2), 0.02))
+    
+  
+    for col in range(1, monte.shape[1]):
+        
+        y = np.array(monte.iloc[:, col])
+        plt.plot(x1, y, color="grey")
+    
+    plt.plot(x1, s1, color="blue", label="Spot Rates")
+    plt.legend(loc='upper right', fontsize='large')   
+        
+if __name__ == "__main__":
+
+    # Read in zero coupon and spot data from the local curve store
+    store  = cs.open_store()
+    zcbs   = store.lookup("zcb", "3/8/2024")[None, :]
+    spots  = store.lookup("monthly", "3/8/2024")[None, :]
+    
+    zeros  = np.array(zcbs[:,0:120])
+    spots  = np.array(spots[:,0:120])
+    cal    = model.build(zeros, 0.012, 1/12)
+    tree   = model.rateTree(cal[0], cal[2], 0.012, 1/12, 'HL')
+    cf     = model.cf_bond(tree, 5.00, 1/12, 1, 4.00)
+    out    = model.priceTree(tree, 1/2, cf, 1/12, "bond", 1)
+    px     = out[0]
+    ptree  = out[1]
+
+
+    monte  = tree_monte_carlo(tree, 250, seed=42, antithetic=True)
+    chart_monte_carlo(monte, spots, 10, 5)                 
+        
+
      
\ No newline at end of file
@@ -1,156 +1,270 @@
-"""
-Mortgage Cash Flow Pricing - Engine
-
-Author: William Carpenter
-
-"""
-import numpy as np
-import pandas as pd
-import os
-import matplotlib.pyplot as plt
-from scipy import interpolate
-from scipy.interpolate import CubicSpline
-import datetime            # working with dates
-import calendar            # working with days 
-from pandas.tseries.offsets import DateOffset
-
-# Generic methodology to create mortgage cashflows
-def cash_flow(settle, cpn, wam, term, balloon, \
-                       io, delay, speed, prepay_type, bal) -> pd.DataFrame:
-    
-    """
-    Robust mortgage cash flow engine.
-    
-    Generates generic mortgage cash flows at various prepayment speeds.
-    
-    Prepay types:  CPR -> conditional prepayment rate
-
-    Assume 30/360 interest rate convention for simplicity.
-    Assume mortgage pool pay delay is 54 days for the investor. 
-    
-    Returns an array of mortgage cash flow.
-    
-    """
-    
-    cols = ['Date','Period', 'Starting Balance', 'Rate', 'Pay Delay', 'Interest', 'Scheduled Principal', \
-            'Unscheduled Principal', 'Cash Flow', 'Ending Balance']
-    
-    orig_bal = bal
-    settle   = pd.to_datetime(settle, format="%m/%d/%Y")
-    cf_month = settle + DateOffset(months=1)
-    cf_date  = datetime.datetime(cf_month.year, cf_month.month, delay-29)
-    
-    # Intialize variables    
-    schedule_princ = 0
-    interest       = 0
-    prepay         = 0
-    cash_flow      = 0
-    discounted_cf  = 0
-    wal            = 0
-    principal      = bal
-    pay_index      = 0
-    month_days     = 30     # assumes 30/360 interest accrual               
-    
-    table   = pd.DataFrame(index=range(balloon), columns=cols)
-
-    for i in range(1, balloon+1):
-        
-        mtg_payment = bal*cpn/100*30/360* \
-                      ((1+cpn/100*30/360)**(wam)) \
-                      /((1+cpn/100*30/360)**(wam)-1)
-        
-        smm = 1-(1-speed/100)**(1/12)   # calculate SMM given a CPR
-
-        pay_month = cf_date
-        
-        
-        table.iloc[i-1,0] = pay_month
-        table.iloc[i-1,1] = i       
-        table.iloc[i-1,2] = bal  
-
-        interest = month_days/360*cpn/100*bal
-         
-        if i < io + 1:
-            principal = 0
-            prepay    = smm*(bal - principal)
-            bal       = bal - principal - prepay
-        
-        elif i == balloon:
-            principal = bal
-            prepay    = 0
-            bal       = 0
-            
-        else:
-            principal = mtg_payment - interest
-            prepay    = smm*(bal - principal)
-            bal       = bal - principal - prepay
-        
-        
-        cash_flow = interest + principal + prepay
-        days_from_settle = (cf_date - settle).days
-        wal = (principal + prepay)*days_from_settle/orig_bal*1/365 + wal
-        wam = wam - 1
-        
-        # adding to table
-        table.iloc[i-1,3] = cpn 
-        table.iloc[i-1,4] = delay 
-        table.iloc[i-1,5] = interest
-        table.iloc[i-1,6] = principal
-        table.iloc[i-1,7] = prepay
-        table.iloc[i-1,8] = cash_flow
-        table.iloc[i-1,9] = bal
-        
-        cf_date = cf_date + DateOffset(months=1)
-                   
-    return table
-
-def wal(settle, cf) -> float:
-    
-    '''
-    Calculate weighted-average-life of a mortgage cash flow.
-    
-    Check variables first. 
-    If zero or negative - raise an exception error.
-    
-    '''
-    
-    arr = cf
-    
-    settle       = pd.to_datetime(settle, format="%m/%d/%Y")
-    arr['settle'] = settle
-    arr['diff']   = (pd.to_datetime(arr['Date']) - arr['settle']).dt.days
-    
-    num          = (arr['diff']*((arr['Scheduled Principal'] + arr['Unscheduled Principal']))).sum()
-    denom        = (arr['Scheduled Principal'] + arr['Unscheduled Principal']).sum()          
-    wal          = num/denom*1/365
-         
-    return wal
-
-
-
-
-
-
-
-
-
-    
-
-
-
-
-
-
- 
-    
-
-    
-
-
-
-
-
-
-
-
-
+"""
+Mortgage Cash Flow Pricing - Engine
+
+Author: William Carpenter
+
+"""
+import numpy as np
+import pandas as pd
+import os
+import matplotlib.pyplot as plt
+from scipy import interpolate
+from scipy.interpolate import CubicSpline
+import datetime            # working with dates
+import calendar            # working with days 
+from pandas.tseries.offsets import DateOffset
+# Custom modules
+import prepayment as prepay       # prepayment speed vectors
+import kernels as kn              # optional compiled kernels
+import settle_calendar as sc      # precomputed settle and pay dates
+
+# Generic methodology to create mortgage cashflows
+def cash_flow(settle, cpn, wam, term, balloon, \
+                       io, delay, speed, prepay_type, bal, frame=True) -> pd.DataFrame:
+    
+    """
+    Robust mortgage cash flow engine.
+    
+    Generates generic mortgage cash flows at various prepayment speeds.
+    
+    Prepay types:  CPR -> conditional prepayment rate
+                   SMM -> single monthly mortality
+                   PSA -> PSA ramp, seasoned by loan age (term - wam)
+    
+    Speed may be a flat speed or a per-month vector. A vector per path 
+    (paths x months) requires frame=False and returns paths x months arrays.
+
+    Assume 30/360 interest rate convention for simplicity.
+    Assume mortgage pool pay delay is 54 days for the investor. 
+    
+    Returns a dataframe of mortgage cash flow, or a dictionary of column 
+    arrays when frame is False (skips the dataframe build entirely). 
+    
+    """
+    
+    smm   = prepay.smm_vector(speed, prepay_type, balloon, term - wam)
+    flows = amortize(cpn, wam, balloon, io, smm, bal)
+    
+    if frame and smm.ndim > 1:
+        raise ValueError("Speed vectors per path require frame=False")
+    
+    table = {'Date'                  : pay_dates(settle, delay, balloon),
+             'Period'                : np.arange(1, balloon+1),
+             'Starting Balance'      : flows[0],
+             'Rate'                  : np.full(balloon, float(cpn)),
+             'Pay Delay'             : np.full(balloon, delay),
+             'Interest'              : flows[1],
+             'Scheduled Principal'   : flows[2],
+             'Unscheduled Principal' : flows[3],
+             'Cash Flow'             : flows[4],
+             'Ending Balance'        : flows[5]}
+    
+    if not frame:
+        return table
+    
+    return pd.DataFrame(table)
+
+
+def amortize(cpn, wam, balloon, io, smm, bal):
+    
+    """
+    Array mortgage amortization engine.
+    
+    Computes the full schedule in closed form instead of month by month. 
+    Scheduled principal on a level-pay mortgage is a fixed fraction of the 
+    current balance given the remaining term, so the balance path is the 
+    cumulative product of monthly survival factors (1-f)*(1-smm).
+    
+    Months run along the last axis. Pool terms (cpn, wam, balloon, io, bal) 
+    and smm may be scalars or arrays that broadcast against each other on 
+    the leading axes; the month axis runs to the longest balloon and pools 
+    with shorter balloons are padded with zeros.
+    
+    Returns
+    ------------
+    Tuple of arrays: starting balance, interest, scheduled principal, 
+    unscheduled principal, cash flow, ending balance
+    
+    """
+    
+    cpn, wam, balloon, io, bal = (np.asarray(x, dtype=float)[..., None] \
+                                  for x in (cpn, wam, balloon, io, bal))
+    
+    if kn.enabled():
+        return _amortize_kernel(cpn, wam, balloon, io, smm, bal)
+    
+    period = np.arange(1, int(np.max(balloon))+1)
+    rate   = 30/360*cpn/100          # assumes 30/360 interest accrual 
+    remain = wam - (period - 1)      # remaining term when each payment is set
+    live   = period <= balloon
+    amort  = period >= io + 1        # past the interest only period
+    
+    # Fraction of the balance paid as scheduled principal each month 
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        sched = np.where(rate == 0, 1/remain, rate/((1+rate)**remain - 1))
+    
+    sched = np.where(period == balloon, 1.0, sched)   # balloon pays off balance
+    sched = np.where(amort & live, sched, 0.0)
+    smm   = np.where(live & ~(amort & (period == balloon)), smm, 0.0)
+    
+    survive = (1 - sched)*(1 - smm)
+    start   = np.ones(survive.shape)
+    start[..., 1:] = np.cumprod(survive[..., :-1], axis=-1)
+    start   = np.where(live, bal*start, 0.0)
+    
+    interest  = rate*start
+    principal = sched*start
+    prepay    = smm*(start - principal)
+    ending    = start - principal - prepay
+    flow      = interest + principal + prepay
+    
+    return (start, interest, principal, prepay, flow, ending)
+
+
+def _amortize_kernel(cpn, wam, balloon, io, smm, bal):
+    
+    # Flatten the broadcast leading axes for the compiled month loop
+    n    = int(np.max(balloon))
+    lead = np.broadcast_shapes(cpn.shape, wam.shape, balloon.shape, io.shape, \
+                               bal.shape, np.shape(smm)[:-1] + (1,))[:-1]
+    flat = lambda x: np.ascontiguousarray(np.broadcast_to(x[..., 0], lead)).reshape(-1)
+    smm  = np.broadcast_to(np.asarray(smm, dtype=float), lead + (n,)).reshape(-1, n)
+    
+    flows = kn.amortize(flat(cpn), flat(wam), flat(balloon), flat(io), \
+                        np.ascontiguousarray(smm), flat(bal))
+    
+    return tuple(x.reshape(lead + (n,)) for x in flows)
+
+
+def cash_flow_batch(settle, cpn, wam, balloon, io, delay, speed, bal, \
+                    prepay_type="CPR", term=None) -> dict:
+    
+    """
+    Batch mortgage cash flow engine.
+    
+    Generates cash flows for many pools across a grid of prepayment speeds 
+    in one call. Pool terms are 1-D arrays (one entry per pool) and speed 
+    is a 1-D grid of flat speeds, or a 2-D array of per-month speed vectors 
+    (one row per scenario), applied to every pool.
+    
+    Parameters
+    ------------
+    settle      : settle date shared by the batch 
+    cpn         : pool coupons
+    wam         : weighted average maturities (months)
+    balloon     : balloon months
+    io          : interest only periods (months)
+    delay       : pay delays (days)
+    speed       : speed grid or speed vectors
+    bal         : current balances
+    prepay_type : CPR, SMM or PSA
+    term        : original terms (months), seasons PSA ramps; defaults to wam
+    
+    Returns:
+    ------------
+    Dictionary of pools x speeds x months arrays keyed like the cash flow 
+    table, pay dates as pools x months, and WAL as pools x speeds. 
+    
+    """
+    
+    pool  = lambda x: np.atleast_1d(np.asarray(x, dtype=float))[:, None]
+    speed = np.asarray(speed, dtype=float)
+    speed = speed.reshape(-1, 1) if speed.ndim < 2 else speed
+    age   = 0 if term is None else pool(term) - pool(wam)
+    smm   = prepay.smm_vector(speed, prepay_type, int(np.max(balloon)), age)
+    
+    delay = np.atleast_1d(delay)
+    flows = amortize(pool(cpn), pool(wam), pool(balloon), pool(io), smm, pool(bal))
+    dates = pay_dates(settle, delay, flows[0].shape[-1])
+    
+    table = {'Date'                  : dates,
+             'Starting Balance'      : flows[0],
+             'Interest'              : flows[1],
+             'Scheduled Principal'   : flows[2],
+             'Unscheduled Principal' : flows[3],
+             'Cash Flow'             : flows[4],
+             'Ending Balance'        : flows[5]}
+    
+    days        = (dates - sc.to_date(sc.day_number(settle))).astype(float)[:, None, :]
+    table['WAL'] = wal_array(days, flows[2] + flows[3])
+    
+    return table
+
+
+def pay_dates(settle, delay, n) -> np.ndarray:
+    
+    """
+    Mortgage pay dates built in one step.
+    
+    First payment falls in the month after settle on day delay-29, every 
+    following payment is the same day of each subsequent month. An array 
+    of delays returns one row of pay dates per delay.
+    
+    Dates are looked up in the shared settle calendar.
+    
+    """
+    
+    days = sc.covering(settle, months=n).pay_days(settle, delay, n)
+    
+    return sc.to_date(days)
+
+
+def wal_array(days, principal) -> np.ndarray:
+    
+    '''
+    Weighted-average-life along the month axis of principal arrays.
+    
+    days      : days from settle to each pay date
+    principal : scheduled plus unscheduled principal
+    
+    '''
+    
+    num   = np.sum(days*principal, axis=-1)
+    denom = np.sum(principal, axis=-1)
+    
+    return num/denom*1/365
+
+
+def wal(settle, cf) -> float:
+    
+    '''
+    Calculate weighted-average-life of a mortgage cash flow.
+    
+    Check variables first. 
+    If zero or negative - raise an exception error.
+    
+    '''
+    
+    days  = sc.day_number(cf['Date'].values) - sc.day_number(settle)
+    princ = cf['Scheduled Principal'].values + cf['Unscheduled Principal'].values
+    
+    return float(wal_array(days, princ))
+
+
+
+
+
+
+
+
+
+    
+
+
+
+
+
+
+ 
+    
+
+    
+
+
+
+
+
+
+
+
+
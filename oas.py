@@ -0,0 +1,241 @@
+"""
+Option-Adjusted Spread
+
+Prices mortgage pools along simulated short rate paths and solves for the
+option-adjusted spread (OAS) that matches market prices.
+
+Short rate paths come from a calibrated rate tree (monte_carlo_pricing).
+Every path drives a rate-dependent prepayment speed (prepayment.refi_smm),
+so each path has its own cash flow from the array amortization engine
+(mortgage_cash_flow.amortize). Cash flows are discounted with the path's
+short rates plus the spread and averaged across paths.
+
+The spread is constant across paths and months, so the path average only
+has to be taken once: with A the path-averaged discounted cash flow of each
+month at zero spread and t the time to each payment,
+
+    price(s) = 100/balance*(sum(A*exp(-s*t)) - accrued)
+
+and the Newton solve for every bond is pure array arithmetic over months.
+
+Spreads are in basis points.
+
+"""
+import numpy as np
+# Custom modules
+import prepayment as prepay
+import mortgage_cash_flow as mbs
+import monte_carlo_pricing as mc
+import curve_store as cs
+
+# Bond x path cells per cash flow batch (bounds memory of the path arrays)
+BATCH_CELLS = 2**15
+
+
+def simulate(tree, paths, seed=None, method="random", antithetic=True) -> np.ndarray:
+
+    """
+    Monthly short rate paths (months x paths) through a rate tree.
+    """
+
+    return mc.tree_monte_carlo(tree, paths, seed=seed, method=method, \
+                               antithetic=antithetic, frame=False)
+
+
+def path_cash_flows(rates, cpn, wam, balloon, io, bal, age=None, **refi) -> tuple:
+
+    """
+    Mortgage cash flows along every rate path.
+
+    Parameters
+    ------------
+    rates   : short rates (months x paths), as from simulate
+    cpn     : pool coupons (scalar or one per pool)
+    wam     : weighted average maturities (months)
+    balloon : balloon months
+    io      : interest only periods (months)
+    bal     : current balances
+    age     : loan ages in months, seasons speeds with the PSA ramp
+    refi    : prepayment.refi_smm overrides (margin, S-curve shape)
+
+    Returns:
+    ------------
+    Tuple of (pools x) paths x months arrays as from amortize: starting
+    balance, interest, scheduled principal, unscheduled principal, cash
+    flow, ending balance
+
+    """
+
+    pool  = lambda x: np.asarray(x, dtype=float)[..., None]
+    n     = int(np.max(balloon))
+
+    if len(rates) < n:
+        raise ValueError(f"Rate paths cover {len(rates)} months, pools need {n}")
+
+    age   = None if age is None else pool(age)
+    smm   = prepay.refi_smm(rates[:n].T, pool(cpn), age=age, **refi)
+
+    return mbs.amortize(pool(cpn), pool(wam), pool(balloon), pool(io), smm, pool(bal))
+
+
+def oas_terms(rates, flows, settle, cpn, delay, bal, delta=1/12) -> dict:
+
+    """
+    Precompute everything in an OAS price that does not depend on spread.
+
+    The first payment is discounted at the root rate for the days to pay
+    (30/360), each later payment at the path rate of every month in between.
+
+    Parameters
+    ------------
+    rates  : short rates (months x paths)
+    flows  : path cash flows ((pools x) paths x months)
+    settle : settle date
+    cpn    : pool coupons, for accrued interest
+    delay  : pay delays (days)
+    bal    : current balances
+    delta  : tree time step (years)
+
+    """
+
+    settle = cs.to_date(settle)
+    months = flows.shape[-1]
+    first  = mbs.pay_dates(settle, delay, 1)[..., 0]
+    stub   = (first - settle).astype(float)/360
+    accr   = (settle - settle.astype("datetime64[M]")).astype(float)/360
+
+    # Path discount from the first pay date to each later pay date
+    cum    = np.zeros([rates.shape[1], months])
+    np.cumsum(rates[1:months].T*delta, axis=1, out=cum[:, 1:])
+    disc   = np.exp(-cum)
+
+    pv     = np.einsum('...pm,pm->...m', flows, disc)/rates.shape[1]
+
+    return {"pv"      : pv*np.exp(-rates[0, 0]*stub)[..., None],
+            "times"   : stub[..., None] + delta*np.arange(months),
+            "accrued" : accr*np.asarray(cpn)/100*np.asarray(bal),
+            "curr"    : np.asarray(bal, dtype=float)}
+
+
+def oas_price(terms, spread, order=0):
+
+    """
+    Price per 100 of current balance from precomputed OAS terms.
+
+    With order=1 also returns the derivative with respect to spread (per bp).
+    """
+
+    spread = np.asarray(spread, dtype=float)
+    scale  = 100/terms["curr"]
+    times  = terms["times"]
+    value  = terms["pv"]*np.exp(-spread[..., None]/10000*times)
+    price  = scale*(np.sum(value, axis=-1) - terms["accrued"])
+
+    if not order:
+        return price
+
+    return (price, -scale*np.sum(value*times, axis=-1)/10000)
+
+
+def solve_oas(terms, px, s0=0, tol=1e-10, maxiter=50) -> tuple:
+
+    """
+    Vectorized Newton solve for the OAS of every bond in the terms.
+
+    Price is convex and decreasing in spread, so Newton converges
+    monotonically after the first step.
+
+    Returns:
+    ------------
+    Tuple of spreads (bp) and iteration counts; bonds that do not converge
+    get a NaN spread.
+
+    """
+
+    px     = np.asarray(px, dtype=float)
+    s      = np.full(np.broadcast(px, terms["curr"]).shape, float(s0))
+    iters  = np.zeros(s.shape, dtype=int)
+    active = np.isfinite(px) & np.ones(s.shape, dtype=bool)
+
+    for i in range(maxiter):
+
+        if not active.any():
+            break
+
+        p, p1    = oas_price(terms, s, order=1)
+        step     = np.where(active, (p - px)/p1, 0)
+        s        = s - step
+        iters   += active
+        active  &= np.abs(step) > tol
+
+    s[active | ~np.isfinite(s) | ~np.isfinite(px)] = np.nan
+
+    return (s, iters)
+
+
+def oas(settle, cpn, wam, balloon, io, delay, bal, px, tree, paths=4096, \
+        seed=None, method="random", antithetic=True, age=None, **refi) -> dict:
+
+    """
+    Option-adjusted spreads for a set of pools priced on one rate tree.
+
+    Pool terms are scalars or 1-D arrays (one entry per pool). Every pool
+    sees the same simulated paths (see oas_paths).
+
+    Returns:
+    ------------
+    Dictionary with OAS (bp), model price at zero spread and iterations
+
+    """
+
+    rates = simulate(tree, paths, seed, method, antithetic)
+
+    return oas_paths(settle, cpn, wam, balloon, io, delay, bal, px, rates, age, **refi)
+
+
+def oas_paths(settle, cpn, wam, balloon, io, delay, bal, px, rates, age=None, **refi) -> dict:
+
+    """
+    Option-adjusted spreads on already simulated short rate paths.
+
+    Pools are processed in batches so the pool x path x month cash flow
+    arrays stay bounded in memory.
+
+    """
+
+    cpn, wam, balloon, io, delay, bal, px = np.broadcast_arrays(*(np.atleast_1d(x) for x in \
+                                            (cpn, wam, balloon, io, delay, bal, px)))
+    age    = None if age is None else np.broadcast_to(age, cpn.shape)
+    size   = max(1, BATCH_CELLS//rates.shape[1])
+    out    = {"OAS": np.empty(len(cpn)), "Price": np.empty(len(cpn)), "Iterations": np.empty(len(cpn), dtype=int)}
+
+    for lo in range(0, len(cpn), size):
+
+        b     = slice(lo, lo+size)
+        flows = path_cash_flows(rates, cpn[b], wam[b], balloon[b], io[b], bal[b], \
+                                None if age is None else age[b], **refi)[4]
+        terms = oas_terms(rates, flows, settle, cpn[b], delay[b], bal[b])
+
+        out["OAS"][b], out["Iterations"][b] = solve_oas(terms, px[b])
+        out["Price"][b] = oas_price(terms, 0)
+
+    return out
+
+
+# Unit testing
+if __name__ == "__main__":
+
+    import time
+    import rate_model_engine as rm
+
+    store = cs.open_store()
+    zeros = store.lookup("zcb", "3/8/2024")[None, :360]
+    cal   = rm.build(zeros, 0.009, 1/12)
+    tree  = rm.rateTree(cal[0], cal[2], 0.009, 1/12, "HL")
+
+    start = time.time()
+    res   = oas("3/8/2024", [5.5, 6.0, 6.5], 358, 358, 0, 54, 1_000_000, \
+                [99.5, 101.0, 102.25], tree, paths=4096, seed=7, age=2)
+
+    print(res)
+    print(f"{time.time() - start:.3f}s")
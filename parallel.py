@@ -0,0 +1,298 @@
+"""
+Parallel Execution
+
+Runs Monte Carlo simulation, tree calibration and portfolio pricing across a
+process pool (concurrent.futures).
+
+Work is always cut into a fixed number of shards, independent of the number
+of workers, and results are reassembled in shard order. Monte Carlo shards
+draw from independent seed streams spawned from one numpy SeedSequence, so a
+given seed produces identical results on 1 worker or 64.
+
+Read-only inputs (curve matrices, rate trees, cash flow matrices) are placed
+in shared memory once per call; tasks carry only the block names and array
+shapes, and every worker maps the blocks instead of unpickling copies. With
+a single worker everything runs in-process on the original arrays.
+
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+# Custom modules
+import monte_carlo_pricing as mc
+import rate_model_engine as rm
+import discount_curve as dc
+import z_spread as zs
+import settle_calendar as sc
+import oas
+
+# Fixed shard count - results do not depend on the number of workers
+SHARDS = 64
+
+# Shared memory blocks mapped by this process, by block name
+_attached = {}
+
+
+class SharedArrays:
+
+    """
+    Read-only arrays copied into shared memory for worker processes.
+
+    Parameters
+    ------------
+    arrays : named arrays to share
+
+    Use as a context manager; the blocks are released on exit. specs holds
+    the small picklable handles passed to tasks (see attach).
+
+    """
+
+    def __init__(self, **arrays):
+
+        self.blocks = []
+        self.specs  = {}
+
+        for name, arr in arrays.items():
+
+            arr = np.ascontiguousarray(arr)
+            shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+            np.ndarray(arr.shape, arr.dtype, buffer=shm.buf)[...] = arr
+
+            self.blocks.append(shm)
+            self.specs[name] = (shm.name, arr.shape, arr.dtype.str)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+
+        for shm in self.blocks:
+            shm.close()
+            shm.unlink()
+
+        self.blocks = []
+
+
+def attach(spec) -> np.ndarray:
+
+    """
+    Read-only view of a shared array from its handle (arrays pass through).
+    """
+
+    if isinstance(spec, np.ndarray):
+        return spec
+
+    name, shape, dtype = spec
+
+    if name not in _attached:
+        _attached[name] = shared_memory.SharedMemory(name=name)
+
+    arr = np.ndarray(shape, dtype, buffer=_attached[name].buf)
+    arr.flags.writeable = False
+
+    return arr
+
+
+def shards(n, count=SHARDS) -> list:
+
+    """
+    Split n items into at most count contiguous (start, stop) shards.
+    """
+
+    edges = np.linspace(0, n, min(count, n)+1).astype(int)
+
+    return [(int(a), int(b)) for a, b in zip(edges[:-1], edges[1:])]
+
+
+def seeds(seed, count=SHARDS) -> list:
+
+    """
+    Independent, reproducible seed streams, one per shard.
+    """
+
+    return np.random.SeedSequence(seed).spawn(count)
+
+
+def run(func, tasks, workers=None, **arrays) -> list:
+
+    """
+    Run func(arrays, *task) for every task, returning results in task order.
+
+    Arrays go to shared memory when more than one worker is used.
+    """
+
+    workers = os.cpu_count() if workers is None else workers
+
+    if workers <= 1:
+        return [func(arrays, *task) for task in tasks]
+
+    with SharedArrays(**arrays) as shared, \
+         ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+
+        futures = [pool.submit(func, shared.specs, *task) for task in tasks]
+
+        return [f.result() for f in futures]
+
+
+def _monte_carlo(arrays, paths, seed, kw):
+
+    tree = attach(arrays["tree"])
+
+    return mc.tree_monte_carlo(tree, paths, seed=np.random.default_rng(seed), \
+                               frame=False, **kw)
+
+
+def monte_carlo(tree, paths, seed=None, workers=None, count=SHARDS, **kw) -> np.ndarray:
+
+    """
+    Sharded tree_monte_carlo: paths are split across shards, each with its
+    own spawned seed stream, and concatenated in shard order.
+
+    Sobol shards are independently scrambled replicates (randomized QMC).
+    Keyword arguments (method, antithetic, bridge) pass to tree_monte_carlo.
+
+    Returns rates as a (periods x paths) array.
+    """
+
+    tree  = mc.binomial_rates(tree)
+    parts = shards(paths, count)
+    tasks = [(b - a, s, kw) for (a, b), s in zip(parts, seeds(seed, len(parts)))]
+
+    return np.concatenate(run(_monte_carlo, tasks, workers, tree=tree), axis=1)
+
+
+def _calibrate(arrays, lo, hi, sigma, delta, kw):
+
+    zcbs = attach(arrays["zcbs"])
+    out  = [rm.build(zcbs[i:i+1], sigma, delta, **kw) for i in range(lo, hi)]
+
+    return [np.array([r[0] for r in out]), np.array([r[1] for r in out]), np.array([r[2] for r in out])]
+
+
+def calibrate(zcbs, sigma, delta, workers=None, count=SHARDS, **kw) -> list:
+
+    """
+    Calibrate one rate tree per curve date (rows of a dates x months zero
+    coupon matrix) with rate_model_engine.build.
+
+    Returns [r0, trees, theta] stacked along a leading date axis.
+    """
+
+    zcbs  = np.atleast_2d(zcbs)
+    tasks = [(a, b, sigma, delta, kw) for a, b in shards(len(zcbs), count)]
+    out   = run(_calibrate, tasks, workers, zcbs=zcbs)
+
+    return [np.concatenate([o[k] for o in out]) for k in range(3)]
+
+
+def _spread(arrays, lo, hi, typ, kw):
+
+    tenors = attach(arrays["tenors"])
+    values = attach(arrays["curve"])
+    curve  = dc.Curve(tenors, values[0]) if len(values) == 1 else \
+             pd.DataFrame(values[lo:hi], columns=tenors)
+
+    get    = lambda name: attach(arrays[name])[lo:hi]
+    terms  = zs.batch_terms(get("flows"), get("principal"), get("settle"), curve, typ, \
+                            get("rate"), get("curr"), get("delay"))
+
+    return zs.spread_batch(terms, get("px"), **kw)
+
+
+def spread_portfolio(flows, principal, settle, curve, px, typ, rate, curr, delay, \
+                     workers=None, count=SHARDS, **kw) -> tuple:
+
+    """
+    Sharded z_spread.batch_terms + spread_batch over a bond portfolio.
+
+    Arguments follow z_spread.batch_terms; curve is one shared row or one
+    row per bond (dataframe or discount_curve.Curve). Keyword arguments
+    pass to spread_batch.
+
+    Returns
+    ------------
+    Tuple of arrays: spreads, iteration counts, failure flags
+    """
+
+    flows  = np.asarray(flows, dtype=float)
+    bonds  = len(flows)
+    each   = lambda x, dtype=None: np.ascontiguousarray(np.broadcast_to(np.asarray(x, dtype=dtype), bonds))
+
+    if isinstance(curve, dc.Curve):
+        tenors, values = curve.tenors, curve.rates[None, :]
+    else:
+        tenors, values = curve.columns.values.astype(int), np.asarray(curve, dtype=float)
+
+    settle = sc.to_date(sc.day_number(np.atleast_1d(settle)))
+    tasks  = [(a, b, typ, kw) for a, b in shards(bonds, count)]
+    out    = run(_spread, tasks, workers, flows=flows, principal=np.asarray(principal, dtype=float), \
+                 settle=each(settle), curve=values, tenors=tenors, px=each(px, float), \
+                 rate=each(rate, float), curr=each(curr, float), delay=each(delay))
+
+    return tuple(np.concatenate([o[k] for o in out]) for k in range(3))
+
+
+def _oas(arrays, lo, hi, settle, refi):
+
+    rates = attach(arrays["rates"])
+    get   = lambda name: attach(arrays[name])[lo:hi]
+    age   = get("age") if "age" in arrays else None
+
+    return oas.oas_paths(settle, get("cpn"), get("wam"), get("balloon"), get("io"), \
+                         get("delay"), get("bal"), get("px"), rates, age=age, **refi)
+
+
+def oas_portfolio(settle, cpn, wam, balloon, io, delay, bal, px, tree, paths=4096, \
+                  seed=None, age=None, workers=None, count=SHARDS, method="random", \
+                  antithetic=True, **refi) -> dict:
+
+    """
+    Sharded oas.oas over a pool portfolio.
+
+    Rate paths are simulated once and shared with every shard (common random
+    numbers across pools); shards only build path cash flows and solve
+    spreads, so each pool's OAS is the same on any number of workers or
+    shards. Keyword arguments pass to prepayment.refi_smm.
+
+    Returns a dictionary of OAS (bp), zero spread price and iterations.
+    """
+
+    cpn    = np.atleast_1d(cpn)
+    each   = lambda x: np.ascontiguousarray(np.broadcast_to(x, cpn.shape))
+    rates  = oas.simulate(tree, paths, seed, method, antithetic)
+    arrays = dict(rates=rates, cpn=cpn, wam=each(wam), balloon=each(balloon), io=each(io), \
+                  delay=each(delay), bal=each(bal), px=each(px))
+
+    if age is not None:
+        arrays["age"] = each(age)
+
+    tasks  = [(a, b, settle, refi) for a, b in shards(len(cpn), count)]
+    out    = run(_oas, tasks, workers, **arrays)
+
+    return {key: np.concatenate([o[key] for o in out]) for key in out[0]}
+
+
+# Unit testing
+if __name__ == "__main__":
+
+    import time
+    import curve_store as cs
+
+    store = cs.open_store()
+    zeros = store.lookup("zcb", "3/8/2024")[None, :360]
+    cal   = rm.build(zeros, 0.009, 1/12)
+    tree  = rm.rateTree(cal[0], cal[2], 0.009, 1/12, "HL")
+
+    for workers in (1, 4):
+
+        start = time.time()
+        paths = monte_carlo(tree, 20000, seed=11, workers=workers, antithetic=True)
+        res   = oas_portfolio("3/8/2024", np.linspace(4.5, 7.0, 16), 358, 358, 0, 54, 1e6, \
+                              100.0, tree, paths=2048, seed=11, workers=workers, count=8)
+
+        print(workers, paths.shape, paths.sum(), res["OAS"][:4], f"{time.time() - start:.2f}s")
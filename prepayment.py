@@ -0,0 +1,163 @@
+"""
+Mortgage Prepayment Speeds
+
+Converts prepayment assumptions into monthly SMM vectors consumed by the
+cash flow engine.
+
+Prepay types:  CPR -> conditional prepayment rate (annualized, %)
+               SMM -> single monthly mortality (%)
+               PSA -> Public Securities Association ramp (100 PSA = 0.2% CPR
+                      per month of loan age up to 6% CPR at month 30)
+
+Speeds are scalars (flat) or arrays whose last axis runs over months. Leading
+axes are scenarios or paths. A vector shorter than the cash flow holds its
+last speed for the remaining months.
+
+Rate-dependent speeds (refi_smm) turn simulated rate paths into per-path SMM
+vectors with an S-curve in the refinancing incentive.
+
+"""
+import numpy as np
+
+# PSA ramp assumptions; do not modify
+PSA_RAMP = 30     # months to reach the terminal speed
+PSA_CPR  = 6      # terminal CPR at 100 PSA
+
+# Refinancing S-curve assumptions
+REFI_BASE   = 6       # CPR with no incentive to refinance (turnover)
+REFI_PEAK   = 50      # CPR approached deep in the money
+REFI_SLOPE  = 1.5     # steepness per 1% of incentive
+REFI_CENTER = 1.0     # incentive (%) at the midpoint of the S-curve
+REFI_MARGIN = 1.75    # mortgage rate over the short rate (%)
+
+
+def cpr_to_smm(cpr) -> np.ndarray:
+
+    """
+    Annual CPR (%) to monthly SMM (decimal).
+    """
+
+    return 1-(1-np.asarray(cpr)/100)**(1/12)
+
+
+def smm_to_cpr(smm) -> np.ndarray:
+
+    """
+    Monthly SMM (decimal) to annual CPR (%).
+    """
+
+    return (1-(1-np.asarray(smm))**12)*100
+
+
+def psa_cpr(psa, n, age=0) -> np.ndarray:
+
+    """
+    PSA ramp as a CPR (%) vector.
+
+    age : loan age in months before the first cash flow
+
+    """
+
+    month = np.asarray(age)[..., None] + np.arange(1, n+1)
+    ramp  = np.minimum(month/PSA_RAMP, 1)*PSA_CPR
+
+    return extend(psa, n)/100*ramp
+
+
+def extend(speed, n) -> np.ndarray:
+
+    """
+    Fit a speed vector to n months along the last axis.
+
+    Longer vectors are truncated, shorter vectors repeat their last speed.
+
+    """
+
+    speed = np.asarray(speed, dtype=float)
+
+    if speed.ndim == 0:
+        speed = speed[None]
+
+    if speed.shape[-1] >= n:
+        return speed[..., :n]
+
+    tail = np.repeat(speed[..., -1:], n - speed.shape[-1], axis=-1)
+
+    return np.concatenate((speed, tail), axis=-1)
+
+
+def smm_vector(speed, prepay_type, n, age=0) -> np.ndarray:
+
+    """
+    Precompute the SMM vector for a prepayment assumption.
+
+    Parameters
+    ------------
+    speed       : scalar speed or per-month speed vector(s)
+    prepay_type : CPR, SMM or PSA
+    n           : number of months
+    age         : loan age in months (only used by PSA)
+
+    Returns:
+    ------------
+    Array of monthly SMMs (decimal) with months on the last axis
+
+    """
+
+    typ = prepay_type.upper()
+
+    if typ == "CPR":
+        return cpr_to_smm(extend(speed, n))
+
+    elif typ == "SMM":
+        return extend(speed, n)/100
+
+    elif typ == "PSA":
+        return cpr_to_smm(psa_cpr(speed, n, age))
+
+    raise ValueError(f"Unknown prepay type: {prepay_type}")
+
+
+def refi_cpr(incentive, base=REFI_BASE, peak=REFI_PEAK, slope=REFI_SLOPE, \
+             center=REFI_CENTER) -> np.ndarray:
+    
+    """
+    Refinancing S-curve: CPR (%) from the incentive (coupon less the 
+    prevailing mortgage rate, %). Runs from base when out of the money to 
+    peak deep in the money.
+    """
+    
+    shape = 0.5 + np.arctan(slope*(np.asarray(incentive) - center))/np.pi
+    
+    return base + (peak - base)*shape
+
+
+def refi_smm(rates, cpn, margin=REFI_MARGIN, age=None, **curve) -> np.ndarray:
+    
+    """
+    Rate-dependent SMM vectors from simulated short rates.
+    
+    Parameters
+    ------------
+    rates  : short rates (decimal) with months on the last axis, one row 
+             per path
+    cpn    : mortgage coupon (%), broadcasts against the leading axes
+    margin : mortgage rate over the short rate (%)
+    age    : loan age in months before the first cash flow; seasons the 
+             speeds with the PSA ramp when given
+    curve  : S-curve overrides passed to refi_cpr
+    
+    Returns:
+    ------------
+    Array of monthly SMMs (decimal), same shape as rates (broadcast)
+    
+    """
+    
+    rates = np.asarray(rates, dtype=float)
+    cpr   = refi_cpr(np.asarray(cpn)[..., None] - (100*rates + margin), **curve)
+    
+    if age is not None:
+        month = np.asarray(age)[..., None] + np.arange(1, rates.shape[-1]+1)
+        cpr   = cpr*np.minimum(month/PSA_RAMP, 1)
+    
+    return cpr_to_smm(cpr)
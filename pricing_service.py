@@ -0,0 +1,543 @@
+"""
+Pricing Service
+
+Long-running local pricing server on asyncio. Clients send one JSON request
+per line over TCP and receive one JSON response per line (matched by id, in
+completion order).
+
+Curves and calibrated rate trees stay warm in memory between requests, as do
+pool cash flows. Requests arriving within a short window (WINDOW seconds) are
+coalesced into one micro-batch; within a batch, requests that share an
+operation, spread type, curve date and settle date are solved together in
+one vectorized call:
+
+    price  -> z_spread.batch_terms + price_terms
+    spread -> z_spread.batch_terms + spread_batch
+    oas    -> oas.oas on the warm rate tree
+
+Batches are solved on one worker thread, so the event loop keeps reading
+requests while a batch is running. Every response reports its latency
+(receipt to reply) and the size of the batch it was solved in; the stats
+operation summarises latencies since start.
+
+Example request:
+
+    {"id": 1, "op": "spread", "settle": "3/8/2024", "typ": "Z", "cpn": 6.5,
+     "wam": 358, "balloon": 358, "speed": 7, "price": 101.5}
+
+"""
+import json
+import time
+import asyncio
+import argparse
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+# Custom modules
+import mortgage_cash_flow as mbs
+import z_spread as zs
+import rate_model_engine as rm
+import curve_store as cs
+import settle_calendar as sc
+import oas
+
+HOST      = "127.0.0.1"
+PORT      = 8765
+WINDOW    = 0.002     # seconds a batch stays open after its first request
+MAX_BATCH = 4096      # requests per batch
+
+# Cash flows kept warm, keyed by pool terms
+CACHE_SIZE = 4096
+
+# Pool terms not given in a request
+POOL = {"term"        : None,      # defaults to wam
+        "io"          : 0,
+        "delay"       : 54,
+        "speed"       : 0,
+        "prepay_type" : "CPR",
+        "bal"         : 1_000_000}
+
+# Market input each operation solves from
+INPUT = {"price": "spread", "spread": "price", "oas": "price"}
+
+# Curve set used for each spread type
+CURVES = {"Z": "monthly", "I": "par"}
+
+# Binomial rate tree models for OAS requests
+MODELS = ("HL", "BDT")
+
+
+class PricingService:
+
+    """
+    Micro-batching pricing server with warm curves, trees and cash flows.
+
+    Parameters
+    ------------
+    store     : curve store (opens the default store when None)
+    window    : seconds to wait for more requests once a batch has started
+    max_batch : largest batch solved at once
+    sigma     : default rate tree volatility for OAS requests
+    months    : rate tree length (months)
+
+    """
+
+    def __init__(self, store=None, window=WINDOW, max_batch=MAX_BATCH, sigma=0.009, months=360):
+
+        self.store     = cs.open_store() if store is None else store
+        self.window    = window
+        self.max_batch = max_batch
+        self.sigma     = sigma
+        self.months    = months
+        self.queue     = None
+        self.executor  = ThreadPoolExecutor(max_workers=1)
+
+        self._curves  = {}
+        self._trees   = {}
+        self._flows   = OrderedDict()
+        self._latency = deque(maxlen=100_000)
+        self._batches = deque(maxlen=100_000)
+
+    # Warm state
+
+    def curve(self, typ, date):
+
+        """
+        Curve for a spread type and date (cached).
+        """
+
+        key = (typ, sc.day_number(date))
+
+        if key not in self._curves:
+            if typ not in CURVES:
+                raise ValueError(f"Unknown spread type: {typ}")
+            self._curves[key] = self.store.curve(CURVES[typ], date)
+
+        return self._curves[key]
+
+    def tree(self, date, sigma=None, model="HL"):
+
+        """
+        Rate tree calibrated to the zero coupon curve of a date (cached).
+        """
+
+        sigma = self.sigma if sigma is None else sigma
+        key   = (sc.day_number(date), float(sigma), model)
+
+        if key not in self._trees:
+            zeros = self.store.lookup("zcb", date)[None, :self.months]
+            self._trees[key] = rm.build(zeros, sigma, 1/12, model=model)[1]
+
+        return self._trees[key]
+
+    def cash_flow(self, req) -> dict:
+
+        """
+        Cash flow columns of the pool in a request (cached, least recently
+        used dropped first).
+        """
+
+        pool = dict(POOL, **{k: req[k] for k in POOL if k in req})
+        term = req["wam"] if pool["term"] is None else pool["term"]
+        key  = (sc.day_number(req["settle"]), float(req["cpn"]), int(req["wam"]), int(term), \
+                int(req["balloon"]), int(pool["io"]), int(pool["delay"]), float(pool["speed"]), \
+                pool["prepay_type"], float(pool["bal"]))
+
+        if key in self._flows:
+            self._flows.move_to_end(key)
+            return self._flows[key]
+
+        flows = mbs.cash_flow(req["settle"], key[1], key[2], key[3], key[4], key[5], key[6], \
+                              key[7], key[8], key[9], frame=False)
+
+        self._flows[key] = flows
+
+        if len(self._flows) > CACHE_SIZE:
+            self._flows.popitem(last=False)
+
+        return flows
+
+    def warm(self, dates, trees=False):
+
+        """
+        Load curves (and optionally calibrate trees) for curve dates up front.
+        """
+
+        for date in dates:
+            for typ in CURVES:
+                self.curve(typ, date)
+            if trees:
+                self.tree(date)
+
+    # Batch solves
+
+    def solve(self, requests) -> list:
+
+        """
+        Solve a batch of requests, grouping those that share a vectorized
+        solve. Returns one result dictionary (or exception) per request.
+        """
+
+        results = [None]*len(requests)
+        flows   = [None]*len(requests)
+        groups  = {}
+
+        # Bad requests fail alone, before their group is solved
+        for i, req in enumerate(requests):
+            try:
+                key      = group_key(req)
+                flows[i] = self.validate(req, key)
+                groups.setdefault(key, []).append(i)
+            except Exception as e:
+                results[i] = e
+
+        for key, index in groups.items():
+
+            solver = {"price": self._price, "spread": self._spread, "oas": self._oas}[key[0]]
+
+            try:
+                out = solver([requests[i] for i in index], [flows[i] for i in index])
+            except Exception as e:
+                out = [e] if len(index) == 1 else None
+
+            # A failed group is solved again one request at a time
+            if out is None:
+                out = []
+                for i in index:
+                    try:
+                        out += solver([requests[i]], [flows[i]])
+                    except Exception as e:
+                        out.append(e)
+
+            for i, res in zip(index, out):
+                results[i] = res
+
+        return results
+
+    def validate(self, req, key):
+
+        """
+        Check one request against the warm curves and trees before it joins
+        a group. Returns its cash flow (None for OAS requests).
+        """
+
+        float(req[INPUT[key[0]]])
+        date = req.get("curve", req["settle"])
+
+        if key[0] == "oas":
+
+            float(req["cpn"])
+            term  = max(int(req["wam"]), int(req["balloon"]))
+            paths = key[5]
+
+            if key[4] not in MODELS:
+                raise ValueError(f"Unknown rate model: {key[4]} (supported: {', '.join(MODELS)})")
+
+            if not isinstance(paths, int) or paths <= 0:
+                raise ValueError(f"paths must be a positive integer, got {paths!r}")
+
+            if term > self.months:
+                raise ValueError(f"Pool term of {term} months is longer than the {self.months} month rate tree")
+
+            self.tree(date, key[3], key[4])
+
+            return None
+
+        flows = self.cash_flow(req)
+        curve = self.curve(key[1], date)
+
+        # Z spreads discount every month on the curve's monthly spot rates
+        if key[1] == "Z" and len(flows["Cash Flow"]) > len(curve.rates):
+            raise ValueError(f"Cash flow of {len(flows['Cash Flow'])} months is longer than the "
+                             f"{len(curve.rates)} month spot curve")
+
+        return flows
+
+    def _terms(self, reqs, flows) -> dict:
+
+        # Stacked cash flows of a group as batch spread terms
+        n     = max(len(f["Cash Flow"]) for f in flows)
+        cfs   = np.zeros([len(flows), n])
+        princ = np.zeros([len(flows), n])
+
+        for i, f in enumerate(flows):
+            cfs[i, :len(f["Cash Flow"])]   = f["Cash Flow"]
+            princ[i, :len(f["Cash Flow"])] = f["Scheduled Principal"] + f["Unscheduled Principal"]
+
+        first = reqs[0]
+        curve = self.curve(first.get("typ", "Z"), first.get("curve", first["settle"]))
+
+        return zs.batch_terms(cfs, princ, first["settle"], curve, first.get("typ", "Z"), \
+                              [f["Rate"][0] for f in flows], [f["Starting Balance"][0] for f in flows], \
+                              [f["Pay Delay"][0] for f in flows])
+
+    def _price(self, reqs, flows) -> list:
+
+        prices = zs.price_terms(self._terms(reqs, flows), np.array([r["spread"] for r in reqs], dtype=float))
+
+        return [{"price": float(p)} for p in prices]
+
+    def _spread(self, reqs, flows) -> list:
+
+        spread, iters, failed = zs.spread_batch(self._terms(reqs, flows), np.array([r["price"] for r in reqs], dtype=float))
+
+        return [{"spread": None if f else float(s), "iterations": int(i), "failed": bool(f)} \
+                for s, i, f in zip(spread, iters, failed)]
+
+    def _oas(self, reqs, flows=None) -> list:
+
+        first = reqs[0]
+        tree  = self.tree(first.get("curve", first["settle"]), first.get("sigma"), first.get("model", "HL"))
+        get   = lambda k: np.array([r.get(k, POOL.get(k)) for r in reqs], dtype=float)
+        wam   = get("wam")
+        term  = np.array([r.get("term") or r["wam"] for r in reqs], dtype=float)
+        out   = oas.oas(first["settle"], get("cpn"), wam, get("balloon"), get("io"), get("delay"), \
+                        get("bal"), get("price"), tree, paths=first.get("paths", 4096), \
+                        seed=first.get("seed", 0), age=term - wam)
+
+        return [{"oas": None if np.isnan(s) else float(s), "model_price": float(p), "iterations": int(i)} \
+                for s, p, i in zip(out["OAS"], out["Price"], out["Iterations"])]
+
+    # Event loop
+
+    async def submit(self, req) -> dict:
+
+        """
+        Queue a request for the next batch and wait for its result.
+        """
+
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((req, future, time.perf_counter()))
+
+        return await future
+
+    async def batcher(self):
+
+        """
+        Collect requests for up to window seconds (or max_batch requests),
+        solve them on the worker thread and resolve their futures.
+        """
+
+        loop = asyncio.get_running_loop()
+
+        while True:
+
+            batch    = [await self.queue.get()]
+            deadline = loop.time() + self.window
+
+            while len(batch) < self.max_batch:
+
+                if not self.queue.empty():
+                    batch.append(self.queue.get_nowait())
+                    continue
+
+                remain = deadline - loop.time()
+
+                if remain <= 0:
+                    break
+
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), remain))
+                except asyncio.TimeoutError:
+                    break
+
+            # A failed batch fails its own requests, the batcher keeps running
+            try:
+                results = await loop.run_in_executor(self.executor, self.solve, [b[0] for b in batch])
+            except Exception as e:
+                results = [e]*len(batch)
+
+            done    = time.perf_counter()
+
+            self._batches.append(len(batch))
+
+            for (req, future, start), res in zip(batch, results):
+
+                latency = (done - start)*1000
+                self._latency.append(latency)
+
+                if isinstance(res, Exception):
+                    res = {"error": f"{type(res).__name__}: {res}"}
+
+                if not future.done():
+                    future.set_result(dict(res, id=req.get("id"), latency_ms=latency, batch=len(batch)))
+
+    def stats(self) -> dict:
+
+        """
+        Latency percentiles (ms) and batch sizes since start.
+        """
+
+        lat = np.array(self._latency)
+
+        if not lat.size:
+            return {"requests": 0}
+
+        return {"requests"   : int(lat.size),
+                "batches"    : len(self._batches),
+                "mean_batch" : float(np.mean(self._batches)),
+                "mean_ms"    : float(lat.mean()),
+                "p50_ms"     : float(np.percentile(lat, 50)),
+                "p95_ms"     : float(np.percentile(lat, 95)),
+                "p99_ms"     : float(np.percentile(lat, 99))}
+
+    async def respond(self, line, writer):
+
+        try:
+            req = json.loads(line)
+            res = {"id": req.get("id"), **self.stats()} if req.get("op") == "stats" else await self.submit(req)
+        except (ValueError, AttributeError) as e:
+            res = {"error": f"Invalid request: {e}"}
+
+        writer.write((json.dumps(res) + "\n").encode())
+
+    async def handle(self, reader, writer):
+
+        """
+        One client connection: every line is answered as soon as its batch
+        is solved, so responses may come back out of order.
+        """
+
+        tasks = set()
+
+        try:
+            async for line in reader:
+                if line.strip():
+                    task = asyncio.create_task(self.respond(line, writer))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+
+            if tasks:
+                await asyncio.gather(*tasks)
+
+            await writer.drain()
+
+        finally:
+            writer.close()
+
+    async def start(self, host=HOST, port=PORT):
+
+        """
+        Start the batcher and the TCP server (returns the asyncio server).
+        """
+
+        self.queue  = asyncio.Queue()
+        self._task  = asyncio.create_task(self.batcher())
+
+        return await asyncio.start_server(self.handle, host, port, limit=2**20)
+
+    async def serve(self, host=HOST, port=PORT):
+
+        server = await self.start(host, port)
+
+        async with server:
+            await server.serve_forever()
+
+
+def group_key(req) -> tuple:
+
+    """
+    Requests with the same key are solved in one vectorized call.
+    """
+
+    op = req["op"]
+
+    if op not in ("price", "spread", "oas"):
+        raise ValueError(f"Unknown operation: {op}")
+
+    settle = request_date(req["settle"])
+    curve  = request_date(req.get("curve", req["settle"]))
+
+    if op == "oas":
+        return (op, settle, curve, req.get("sigma"), req.get("model", "HL"), req.get("paths", 4096), req.get("seed", 0))
+
+    return (op, req.get("typ", "Z"), settle, curve)
+
+
+def request_date(date) -> int:
+
+    """
+    m/d/yyyy date of a request as a day number.
+    """
+
+    if not isinstance(date, str):
+        raise TypeError(f"Dates must be m/d/yyyy strings, got {date!r}")
+
+    return sc.day_number(date)
+
+
+async def query(requests, host=HOST, port=PORT) -> list:
+
+    """
+    Send requests over one connection and collect the responses (by id order
+    of arrival).
+    """
+
+    reader, writer = await asyncio.open_connection(host, port, limit=2**20)
+    writer.write("".join(json.dumps(r) + "\n" for r in requests).encode())
+    writer.write_eof()
+    await writer.drain()
+
+    out = [json.loads(line) async for line in reader]
+    writer.close()
+
+    return out
+
+
+async def demo(service, host, port, clients=8, per_client=250):
+
+    # Concurrent clients against a running service, then one request at a time
+    rng   = np.random.default_rng(0)
+    reqs  = [{"id": i, "op": "spread" if i % 2 else "price", "settle": "3/8/2024", "typ": "ZI"[i % 4 // 2], \
+              "cpn": float(rng.choice([5.0, 5.5, 6.0, 6.5])), "wam": 358, "balloon": 358, \
+              "speed": float(rng.integers(5, 20)), "price": float(rng.uniform(97, 104)), "spread": 120.0} \
+             for i in range(clients*per_client)]
+
+    # First pass warms curves and cash flows
+    await asyncio.gather(*(query(reqs[c::clients], host, port) for c in range(clients)))
+    service._latency.clear()
+    service._batches.clear()
+
+    start = time.perf_counter()
+    out   = await asyncio.gather(*(query(reqs[c::clients], host, port) for c in range(clients)))
+    total = time.perf_counter() - start
+    stats = service.stats()
+
+    print(f"{len(reqs)} requests, {clients} clients: {total:.3f}s, {len(reqs)/total:,.0f} req/s, "
+          f"mean batch {stats['mean_batch']:.1f}, p50 {stats['p50_ms']:.2f} ms, p99 {stats['p99_ms']:.2f} ms")
+
+    start = time.perf_counter()
+    for r in reqs[:200]:
+        await query([r], host, port)
+    single = (time.perf_counter() - start)/200
+
+    print(f"one at a time: {single*1000:.2f} ms per request, {1/single:,.0f} req/s")
+
+    check = {r["id"]: r for r in sum(out, [])}
+    print(check[1], check[2], sep="\n")
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Local pricing service (JSON lines over TCP)")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--window", type=float, default=WINDOW, help="batch window (seconds)")
+    parser.add_argument("--warm", nargs="*", default=[], help="curve dates to load up front")
+    parser.add_argument("--demo", action="store_true", help="run a load test against the service and exit")
+    args = parser.parse_args()
+
+    service = PricingService(window=args.window)
+    service.warm(args.warm, trees=True)
+
+    async def main():
+
+        if not args.demo:
+            return await service.serve(args.host, args.port)
+
+        server = await service.start(args.host, args.port)
+
+        async with server:
+            await demo(service, args.host, args.port)
+
+    asyncio.run(main())
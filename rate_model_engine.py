@@ -1,271 +1,519 @@
-"""
-Interest Rate Models
-
-Source Code
-
-Author : William Carpenter
-Date   : April 2024
-
-Objective: Create a binomial tree interest rate model that takes as arguments
-todays forward curve and volatilities. Use the tree to price various bonds and 
-other fixed income derivatives (caps, floors, swaps, etc.).
-
-"""
-import sys
-import os
-import math 
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-from scipy.optimize import newton
-
-# Asset Payoff Lamda Functions 
-cap     = lambda x: 0 
-floor   = lambda x: 0
-swap    = lambda x: 0
-collar  = lambda x: 0
-bond    = lambda x: x
-
-
-def payoff(x, typ):
-    if typ == "bond":
-        return x
-    else:
-        return 0
-    
-    
-
-def cf_floor(rates, strike, delta, notion, cpn):
-    
-    '''
-    Floor Cash Flows
-    '''
-    cf  = np.zeros([len(rates), len(rates)])
-
-    for col in range(0, len(cf)-1):
-        for row in range(0, col+1):
-            rate = rates[row,col]
-            cf[row, col] = delta*notion*max(strike/100-rate, 0)
-            
-    return cf 
-
-def cf_cap(rates, strike, delta, notion, cpn):
-    '''
-    Cap Cash Flows
-    '''
-    cf  = np.zeros([len(rates), len(rates)])
-
-    for col in range(0, len(cf)-1):
-        for row in range(0, col+1):
-            rate = rates[row,col]
-            cf[row, col] = delta*notion*max(rate-strike/100, 0)
-
-    return cf
-
-
-def cf_bond(rates, strike, delta, notion, cpn):
-    
-    '''
-    Bond Cash flows
-    '''
-    cf  = np.zeros([len(rates), len(rates)])
-
-    for col in range(0, len(cf)-1):
-        for row in range(0, col+1):
-            cf[row, col] = delta*notion*cpn/100  
-    
-    return cf
-
-def cf_swap(rates, strike, delta, notion, cpn):
-    
-    f  = np.zeros([len(rates), len(rates)])
-
-    for col in range(0, len(cf)-1):
-        for row in range(0, col+1):
-            rate = rates[row,col]
-            cf[row, col] = strike/100 - rate     
-            
-    return cf
-
-
-def display(arr):
-  for i in arr:
-    for j in i:
-        print("{:8.4f}".format(j), end="  ")
-    print() 
-  print("\n")
-
-
-def probTree(length):
-    '''
-    Generating a probability tree - assumed to be up/down 50%/50% for this project
-
-    '''
-    prob = np.zeros((length, length))
-    prob[np.triu_indices(length, 0)] = 0.5
-    return(prob)
-
-def solver(theta, tree, zcb, i, sigma, delta):    
-        
-    # Create pricing matrix for ZCBs
-    price = np.zeros([i+2, i+2])
-    
-    # assign the last row to be payoff of ZCB
-    price[:,len(price)-1] = 1
-    
-    # Assign new rates to tree 
-    for row in range(0, i+1):
-        if row == 0: 
-            tree[row, i] = tree[row, i-1] + theta*delta + sigma*math.sqrt(delta)
-        else:
-            tree[row, i] = tree[row-1, i-1] + theta*delta - sigma*math.sqrt(delta)
-            
-    # need pricing tree?    
-    for col in reversed(range(0, i+1)):
-        for row in range(0, col+1):
-            node = np.exp(-1*tree[row, col]*(delta))
-            price[row, col] = node*(1/2*price[row, col+1] + 1/2*price[row+1, col+1])     
-    
-    return price[0,0] - zcb    
-    
-def calibrate(tree, zcb, i, sigma, delta):
-
-    '''
-    Calibrated a rate tree - solving for sigma to match ZCB prices. 
-    '''
-    
-    t0    = 0.5
-    miter = 1000
-
-    theta = newton(solver, t0, args=(tree, zcb, i, sigma, delta))
-
-    for row in range(0, i+1):
-        if row == 0: 
-            tree[row, i] = tree[row, i-1] + theta*delta + sigma*math.sqrt(delta)
-        else:
-            tree[row, i] = tree[row-1, i-1] + theta*delta - sigma*math.sqrt(delta)
-    
-    
-    return [theta, tree]
-    
-        
-def build(zcb, sigma, delta):
-    
-    # empty rates tree
-    tree  = np.zeros([zcb.shape[1]+1, zcb.shape[1]+1])
-    # empty theta tree
-    theta = np.zeros([zcb.shape[1]]) 
-    
-    # Initial Zero Coupon rate
-    tree[0,0] = np.log(zcb[0,0])*-1/delta
-    
-    r0        = tree[0,0]
-    
-    for i in range(1, len(theta)):
-        
-        solved   = calibrate(tree, zcb[0,i], i, sigma, delta)
-        
-        # update theta array
-        theta[i] = solved[0]
-        tree     = solved[1]
-        
-    return [r0, tree, theta]
-    
-def rateTree(r0, theta, sigma, delta, model):
-
-    '''
-    General Rate Model Tree Function
-    
-    Sigma (volatility) can be multi-dimentional for the full BDT model
-    Theta is multi-dimentional
-    '''
-
-    tree = np.zeros([len(theta)+1, len(theta)+1])
-    tree[0,0] = r0
-       
-    for col in range(1, len(tree)-1):
-        
-        tree[0, col] = tree[0, col-1] + theta[col]*delta+sigma*math.sqrt(delta)
-   
-    
-    for col in range(1, len(tree)-1):
-        for row in range(1, col+1):
-            tree[row, col] = tree[row-1, col] - 2*sigma*math.sqrt(delta)
-    
-    return tree
-                                            
-def priceTree(rates, prob, cf, delta, typ, notion):
-    
-    '''
-    General Tree Pricing Function 
-    
-    Returns final asset price and tree of price evolution
-    
-    rates    : N+1 x N+1 tree of interest rates 
-    prob     : N+1 x N+1 tree of up/down probabilities
-    delta    : time delta, with a value of 1 being annual 
-    payoff   : payoff funtion 
-    notion   : notional value of the security being priced
-    coupon   : coupon of the security being priced, if relevant 
-    strike   : strike rate of the security being priced if relevant
-    cashflow : cashflow function
-    
-    '''
-            
-    tree = np.zeros([len(rates), len(rates)])
-
-    tree[:,len(tree)-1] = payoff(notion, typ)
-        
-    for col in reversed(range(0,len(tree)-1)):  
-        
-        for row in range(0, col+1):
-            
-            rate = rates[row,col]
-            pu = pd = 1/2 
-            tree[row, col] = np.exp(-1*rate*delta)* \
-                             (pu*(tree[row, col+1]+cf[row,col+1]) + pd*(tree[row+1, col+1]+cf[row+1, col+1]))      
-
-    
-    return (tree[0,0], tree) 
-
-# Unit testing        
-if __name__ == "__main__":
-        
-    # theta = [0.021145, 0.013807] 
-    # small ho-lee tree
-    # ho_lee = rateTree(0.0169, [0.021145, 0.013807], 0.015, 0.5, 'BDT')
-    
-    zero_coupons = pd.read_csv('https://raw.githubusercontent.com/wrcarpenter/Interest-Rate-Models/main/Data/zcbs.csv')
-    
-    zcbs = zero_coupons.loc[zero_coupons['Date']=='3/8/2024']
-    zcbs = zcbs.drop("Date", axis=1)
-    
-    # zcbs = np.array(zcbs.iloc[:,0:4])  # these are my zero coupon bonds
-    
-    tre = rateTree(0.045, [0.07, 0.12, 0.15, 0.02, 0.02, 0.02], 0.001,1/12, "HL")
-    c   = cf_bond(tre, 5.00, 1/12, 1, 0.00)
-    p   = priceTree(tre, 1/2, c, 1/12, bond, 1)
-    
-    # small example for calibration
-    zeros = np.array(zcbs.iloc[:,0:60])
-    x     = build(zeros, 0.009, 1/12)
-    tr    = rateTree(x[0], x[2], 0.009, 1/12, 'HL')
-    c     = cf_bond(tr, 5.00, 1/12, 1, 0.00)
-    p     = priceTree(tr, 1/2, c, 1/12, bond, 1)
-    print(zeros[0,zeros.shape[1]-1])
-    print(p[0,0])
-    print(p[0,0] - zeros[0,zeros.shape[1]-1])
-    
-    pd.DataFrame(tr).to_clipboard()
-    
-
-   
-    
-                    
-
-
-
-
-
-
+"""
+Interest Rate Models
+
+Source Code
+
+Author : William Carpenter
+Date   : April 2024
+
+Objective: Create a binomial tree interest rate model that takes as arguments
+todays forward curve and volatilities. Use the tree to price various bonds and 
+other fixed income derivatives (caps, floors, swaps, etc.).
+
+"""
+import sys
+import os
+import math 
+import pandas as pd
+import numpy as np
+import matplotlib.pyplot as plt
+from scipy.optimize import newton
+# Custom modules
+import curve_store as cs
+import lattice as lt
+import kernels as kn
+
+# Asset Payoff Lamda Functions 
+cap     = lambda x: 0 
+floor   = lambda x: 0
+swap    = lambda x: 0
+collar  = lambda x: 0
+bond    = lambda x: x
+
+
+def payoff(x, typ):
+    if typ == "bond":
+        return x
+    else:
+        return 0
+    
+    
+
+def nodes(rates):
+    
+    '''
+    Mask of tree nodes that carry cash flows - the upper triangle of every 
+    column except the last (a boolean lattice for packed rates).
+    '''
+    
+    if isinstance(rates, lt.Lattice):
+        mask = lt.Lattice(rates.size, np.ones(rates.data.shape[-1]), dtype=bool)
+        mask.column(rates.size-1)[:] = False
+        return mask
+    
+    mask = np.triu(np.ones([len(rates), len(rates)], dtype=bool))
+    mask[:, len(rates)-1] = False
+    
+    return mask
+
+
+def strikes(strike, rates=None):
+    
+    # Scalar strikes give one tree, arrays of strikes give a stack of trees
+    strike = np.asarray(strike, dtype=float)
+    
+    return strike[..., None] if isinstance(rates, lt.Lattice) else strike[..., None, None]
+
+
+def values(rates):
+    
+    # Node rates of a dense tree or the packed buffer of a lattice
+    return rates.data if isinstance(rates, lt.Lattice) else rates
+
+
+def paid(rates, cf, mask=None):
+    
+    '''
+    Cash flows on the paying nodes - a lattice (or stack of lattices) for 
+    packed rates, a dense tree otherwise.
+    '''
+    
+    mask = nodes(rates) if mask is None else mask
+    
+    if isinstance(rates, lt.Lattice):
+        return lt.Lattice(rates.size, np.where(mask.data, cf, 0))
+    
+    return np.where(mask, cf, 0)
+
+
+# Cash flow generators below pay on the nodes of mask (default: nodes of a 
+# dense tree or packed lattice); lattices from short_rate_models pass their 
+# own node mask.
+
+
+def cf_floor(rates, strike, delta, notion, cpn, mask=None):
+    
+    '''
+    Floor Cash Flows
+    '''
+    cf = delta*notion*np.maximum(strikes(strike, rates)/100-values(rates), 0)
+            
+    return paid(rates, cf, mask) 
+
+def cf_cap(rates, strike, delta, notion, cpn, mask=None):
+    '''
+    Cap Cash Flows
+    '''
+    cf = delta*notion*np.maximum(values(rates)-strikes(strike, rates)/100, 0)
+
+    return paid(rates, cf, mask)
+
+
+def cf_bond(rates, strike, delta, notion, cpn, mask=None):
+    
+    '''
+    Bond Cash flows
+    '''
+    cf = delta*notion*strikes(cpn, rates)/100*np.ones(values(rates).shape)
+    
+    return paid(rates, cf, mask)
+
+def cf_swap(rates, strike, delta, notion, cpn, mask=None):
+    
+    '''
+    Swap Cash Flows - receive fixed (strike), pay floating
+    '''
+    cf = delta*notion*(strikes(strike, rates)/100 - values(rates))
+            
+    return paid(rates, cf, mask)
+
+
+def display(arr):
+  for i in arr:
+    for j in i:
+        print("{:8.4f}".format(j), end="  ")
+    print() 
+  print("\n")
+
+
+def probTree(length, packed=False):
+    '''
+    Generating a probability tree - assumed to be up/down 50%/50% for this project
+
+    '''
+    if packed:
+        return lt.prob_lattice(length)
+    
+    prob = np.zeros((length, length))
+    prob[np.triu_indices(length, 0)] = 0.5
+    return(prob)
+
+def solver(theta, tree, zcb, i, sigma, delta):    
+    
+    # Assign new rates to tree 
+    tree[:i+1, i] = column(tree[0, i-1] + theta*delta, sigma*math.sqrt(delta), i)
+    
+    # Roll back the ZCB payoff with one rolling column instead of a full 
+    # pricing matrix
+    price = np.ones(i+2)
+    
+    for col in reversed(range(0, i+1)):
+        node  = np.exp(-1*tree[:col+1, col]*(delta))
+        price = node*(1/2*price[:col+1] + 1/2*price[1:col+2])
+    
+    return price[0] - zcb    
+    
+def calibrate(tree, zcb, i, sigma, delta):
+
+    '''
+    Calibrated a rate tree - solving for sigma to match ZCB prices. 
+    '''
+    
+    t0    = 0.5
+    miter = 1000
+
+    theta = newton(solver, t0, args=(tree, zcb, i, sigma, delta))
+
+    tree[:i+1, i] = column(tree[0, i-1] + theta*delta, sigma*math.sqrt(delta), i)
+    
+    return [theta, tree]
+
+
+def column(top, vol, i):
+    
+    '''
+    Ho-Lee rates of tree column i: one vol step up from the previous top 
+    node (plus drift), then evenly spaced 2*vol apart down the column.
+    '''
+    
+    return top + vol - 2*vol*np.arange(i+1)
+    
+        
+def build(zcb, sigma, delta, method="forward", model="HL"):
+    
+    '''
+    Calibrate a rate tree to zero coupon bond prices.
+    
+    Models:   HL      -> Ho-Lee (normal), theta is the drift per period
+              BDT     -> Black-Derman-Toy (lognormal), theta is the median 
+                         rate per period (forward induction only)
+    
+    Methods:  forward -> forward induction on Arrow-Debreu state prices, 
+                         closed-form theta for each period (O(N^2))
+              newton  -> Newton solve per period, repricing the ZCB tree by 
+                         backward induction on every iteration
+    
+    Sigma may be a scalar or a vector with one volatility per period. 
+    Hull-White trees are trinomial (short_rate_models.build).
+    
+    Returns [r0, tree, theta]
+    '''
+    
+    if model not in ("HL", "BDT"):
+        raise ValueError(f"Unknown rate model: {model}")
+    
+    if method not in ("forward", "newton"):
+        raise ValueError(f"Unknown calibration method: {method}")
+    
+    if model == "BDT":
+        if method != "forward":
+            raise ValueError("BDT trees are calibrated by forward induction only")
+        return build_bdt(zcb, sigma, delta)
+    
+    if method == "forward":
+        return build_forward(zcb, sigma, delta)
+    
+    # empty rates tree
+    tree  = np.zeros([zcb.shape[1]+1, zcb.shape[1]+1])
+    # empty theta tree
+    theta = np.zeros([zcb.shape[1]]) 
+    sigma = vols(sigma, len(theta))
+    
+    # Initial Zero Coupon rate
+    tree[0,0] = np.log(zcb[0,0])*-1/delta
+    
+    r0        = tree[0,0]
+    
+    for i in range(1, len(theta)):
+        
+        solved   = calibrate(tree, zcb[0,i], i, sigma[i], delta)
+        
+        # update theta array
+        theta[i] = solved[0]
+        tree     = solved[1]
+        
+    return [r0, tree, theta]
+
+
+def vols(sigma, n):
+    
+    # Scalar volatility or one volatility per period
+    return np.broadcast_to(np.asarray(sigma, dtype=float), (n,))
+
+
+def forward(state, tree, i, delta):
+    
+    '''
+    Arrow-Debreu state prices for column i from those of column i-1 - half 
+    of each discounted parent goes to each child.
+    '''
+    
+    parent = state*np.exp(-tree[:i, i-1]*delta)
+    state  = np.zeros(i+1)
+    state[:i] += 1/2*parent
+    state[1:] += 1/2*parent
+    
+    return state
+
+
+def build_forward(zcb, sigma, delta):
+    
+    '''
+    Ho-Lee calibration by forward induction.
+    
+    Arrow-Debreu state prices Q are carried forward one column at a time. 
+    The ZCB maturing after column i prices as sum(Q*exp(-r*delta)) and 
+    theta shifts every rate in the column by theta*delta, so
+    
+        theta = log(sum(Q*exp(-base*delta))/zcb)/delta^2
+    
+    where base are the column rates before drift. 
+    '''
+    
+    n     = zcb.shape[1]
+    tree  = np.zeros([n+1, n+1])
+    theta = np.zeros([n])
+    vol   = vols(sigma, n)*math.sqrt(delta)
+    
+    if kn.enabled():
+        tree, theta = kn.build_forward(np.asarray(zcb[0], dtype=float), np.ascontiguousarray(vol), delta)
+        return [tree[0,0], tree, theta]
+    
+    # Initial Zero Coupon rate
+    tree[0,0] = np.log(zcb[0,0])*-1/delta
+    r0        = tree[0,0]
+    
+    state = np.ones(1)    # state prices for column 0
+    
+    for i in range(1, n):
+        
+        state = forward(state, tree, i, delta)
+        base  = column(tree[0, i-1], vol[i], i)
+        
+        theta[i]      = np.log(np.sum(state*np.exp(-base*delta))/zcb[0,i])/delta**2
+        tree[:i+1, i] = base + theta[i]*delta
+    
+    return [r0, tree, theta]
+
+
+def build_bdt(zcb, sigma, delta, tol=1e-14, miter=50):
+    
+    '''
+    Black-Derman-Toy calibration by forward induction.
+    
+    Column i rates are lognormal around a median U: U*exp(vol*(i - 2*row)). 
+    With state prices Q carried forward, the median solves 
+    
+        sum(Q*exp(-U*shape*delta)) = zcb
+    
+    a 1-D Newton solve on a vector (the price is convex and decreasing in U). 
+    '''
+    
+    n     = zcb.shape[1]
+    tree  = np.zeros([n+1, n+1])
+    theta = np.zeros([n])
+    vol   = vols(sigma, n)*math.sqrt(delta)
+    
+    if kn.enabled():
+        tree, theta = kn.build_bdt(np.asarray(zcb[0], dtype=float), np.ascontiguousarray(vol), \
+                                   delta, tol, miter)
+        return [tree[0,0], tree, theta]
+    
+    # Initial Zero Coupon rate
+    tree[0,0] = np.log(zcb[0,0])*-1/delta
+    r0        = tree[0,0]
+    theta[0]  = r0
+    
+    state = np.ones(1)    # state prices for column 0
+    
+    for i in range(1, n):
+        
+        state = forward(state, tree, i, delta)
+        shape = np.exp(vol[i]*(i - 2*np.arange(i+1)))
+        u     = theta[i-1]
+        
+        for k in range(miter):
+            node = state*np.exp(-u*shape*delta)
+            step = (np.sum(node) - zcb[0,i])/(-np.sum(node*shape)*delta)
+            u    = u - step
+            if abs(step) < tol:
+                break
+        
+        theta[i]      = u
+        tree[:i+1, i] = u*shape
+    
+    return [r0, tree, theta]
+    
+def rateTree(r0, theta, sigma, delta, model, packed=False):
+
+    '''
+    General Rate Model Tree Function
+    
+    Models:  HL  -> Ho-Lee, theta is the drift per period 
+             BDT -> Black-Derman-Toy, theta is the median rate per period 
+    
+    Sigma (volatility) can be multi-dimentional (one per period) for either 
+    model. Theta is multi-dimentional
+    
+    packed=True returns the tree as a packed triangular lattice (Ho-Lee 
+    columns are generated directly, other models are packed from the dense 
+    tree).
+    '''
+    
+    if packed:
+        if model == "HL":
+            return lt.rate_lattice(r0, theta, sigma, delta)
+        return lt.Lattice.from_dense(rateTree(r0, theta, sigma, delta, model))
+
+    tree = np.zeros([len(theta)+1, len(theta)+1])
+    tree[0,0] = r0
+    vol  = vols(sigma, len(theta))*math.sqrt(delta)
+    
+    for col in range(1, len(tree)-1):
+        
+        if model == "HL":
+            tree[:col+1, col] = column(tree[0, col-1] + theta[col]*delta, vol[col], col)
+        
+        elif model == "BDT":
+            tree[:col+1, col] = theta[col]*np.exp(vol[col]*(col - 2*np.arange(col+1)))
+        
+        else:
+            raise ValueError(f"Unknown rate model: {model}")
+    
+    return tree
+                                            
+def priceTree(rates, prob, cf, delta, typ, notion, disc=None):
+    
+    '''
+    General Tree Pricing Function 
+    
+    Returns final asset price and tree of price evolution
+    
+    rates    : N+1 x N+1 tree of interest rates 
+    prob     : N+1 x N+1 tree of up/down probabilities
+    delta    : time delta, with a value of 1 being annual 
+    payoff   : payoff funtion 
+    notion   : notional value of the security being priced
+    coupon   : coupon of the security being priced, if relevant 
+    strike   : strike rate of the security being priced if relevant
+    cashflow : cashflow function
+    disc     : one-step discount tree from discountTree, reused across 
+               instruments priced on the same rate tree
+    
+    A stack of cash flow trees (K x N+1 x N+1) prices K instruments in one 
+    rollback and returns K prices and K price trees.
+    
+    Packed lattices (lattice.Lattice) for rates or cash flows are priced 
+    in packed storage and return a price lattice; a dense input alongside a 
+    lattice is packed first.
+    
+    '''
+    
+    if isinstance(rates, lt.Lattice) or isinstance(cf, lt.Lattice):
+        rates = rates if isinstance(rates, lt.Lattice) else lt.Lattice.from_dense(rates)
+        cf    = cf if isinstance(cf, lt.Lattice) else lt.Lattice.from_dense(cf)
+        tree  = lt.rollback(rates, cf, delta, payoff(notion, typ))
+        return (tree.column(0)[..., 0][()], tree)
+    
+    if disc is None:
+        disc = discountTree(rates, delta)
+    
+    tree = rollback(disc, cf, payoff(notion, typ))
+    
+    return (tree[..., 0, 0][()], tree) 
+
+
+def discountTree(rates, delta):
+    
+    '''
+    One-step discount factors exp(-r*delta) for every node of a rate tree.
+    '''
+    
+    return np.exp(-1*rates*delta)
+
+
+def rollback(disc, cf, terminal):
+    
+    '''
+    Backward induction one tree column at a time.
+    
+    disc     : N+1 x N+1 one-step discount tree
+    cf       : cash flow tree, or a stack of them (K x N+1 x N+1)
+    terminal : value in the last column (scalar or one per instrument)
+    
+    '''
+    
+    cf   = np.asarray(cf, dtype=float)
+    n    = disc.shape[-1]
+    
+    if kn.enabled():
+        lead = cf.shape[:-2]
+        term = np.broadcast_to(np.asarray(terminal, dtype=float), lead).reshape(-1)
+        tree = kn.rollback(np.ascontiguousarray(disc), np.ascontiguousarray(cf).reshape((-1, n, n)), \
+                           np.ascontiguousarray(term))
+        return tree.reshape(lead + (n, n))
+    
+    tree = np.zeros(cf.shape[:-2] + (n, n))
+    
+    tree[..., :, n-1] = np.asarray(terminal, dtype=float)[..., None]
+    
+    pu = pd = 1/2
+    
+    for col in reversed(range(0, n-1)):
+        
+        value = tree[..., :col+2, col+1] + cf[..., :col+2, col+1]
+        tree[..., :col+1, col] = disc[:col+1, col]* \
+                                 (pu*value[..., :col+1] + pd*value[..., 1:col+2])
+    
+    return tree
+
+# Unit testing        
+if __name__ == "__main__":
+        
+    # theta = [0.021145, 0.013807] 
+    # small ho-lee tree
+    # ho_lee = rateTree(0.0169, [0.021145, 0.013807], 0.015, 0.5, 'BDT')
+    
+    # Zero coupon prices from the local curve store 
+    store = cs.open_store()
+    zcbs  = store.lookup("zcb", "3/8/2024")[None, :]
+    
+    # zcbs = np.array(zcbs.iloc[:,0:4])  # these are my zero coupon bonds
+    
+    tre = rateTree(0.045, [0.07, 0.12, 0.15, 0.02, 0.02, 0.02], 0.001,1/12, "HL")
+    c   = cf_bond(tre, 5.00, 1/12, 1, 0.00)
+    p   = priceTree(tre, 1/2, c, 1/12, bond, 1)
+    
+    # small example for calibration
+    zeros = np.array(zcbs[:,0:60])
+    x     = build(zeros, 0.009, 1/12)
+    tr    = rateTree(x[0], x[2], 0.009, 1/12, 'HL')
+    c     = cf_bond(tr, 5.00, 1/12, 1, 0.00)
+    p     = priceTree(tr, 1/2, c, 1/12, bond, 1)
+    print(zeros[0,zeros.shape[1]-1])
+    print(p[0,0])
+    print(p[0,0] - zeros[0,zeros.shape[1]-1])
+    
+    pd.DataFrame(tr).to_clipboard()
+    
+
+   
+    
+                    
+
+
+
+
+
+
   
\ No newline at end of file
@@ -0,0 +1,258 @@
+"""
+Settle Calendar
+
+Precomputed settlement and payment dates for the pricing engine. Dates are
+integer day numbers (days since 1/1/1970, as datetime64[D] counts), so every
+date quantity in a price is an array lookup or an integer subtraction
+instead of pandas parsing, DateOffset and datetime arithmetic.
+
+For every day in its range the calendar holds:
+
+    month    -> month index of the day (months since the first month)
+    accrued  -> days accrued since the first of the month
+    y, m, d  -> year, month and day, for 30/360 day counts
+
+and for every month the day number of the first of the month. Mortgage pay
+dates fall on day delay-29 of each month after settle, so the pay dates of
+a delay convention are one shifted copy of the month starts (built once per
+delay and cached):
+
+    pay date k = month start[month(settle) + k] + delay - 30
+
+A shared calendar is grown on demand (covering) so callers never have to
+size it. m/d/yyyy strings are parsed once and cached.
+
+"""
+import datetime
+import numpy as np
+
+# Default calendar range and the longest cash flow (months) it serves
+START  = "1/1/1990"
+END    = "12/31/2079"
+MONTHS = 480
+
+# Parsed m/d/yyyy strings -> day numbers
+_parsed = {}
+
+# Shared calendar, built on first use
+_shared = None
+
+
+def day_number(date):
+
+    """
+    m/d/yyyy strings, timestamps, datetime64 or day numbers (scalars or
+    arrays) to integer day numbers.
+    """
+
+    if isinstance(date, (int, np.integer)):
+        return int(date)
+
+    if isinstance(date, np.str_):
+        date = str(date)
+
+    if isinstance(date, str):
+
+        if date not in _parsed:
+            _parsed[date] = int(np.datetime64(datetime.datetime.strptime(date, "%m/%d/%Y"), "D").astype(np.int64))
+
+        return _parsed[date]
+
+    arr = np.asarray(date)
+
+    if arr.dtype.kind in "iu":
+        return arr.astype(np.int64)
+
+    if arr.dtype.kind in "OUS":
+        days = np.array([day_number(x if isinstance(x, str) else np.datetime64(x, "D")) \
+                         for x in arr.ravel()], dtype=np.int64).reshape(arr.shape)
+        return int(days) if days.ndim == 0 else days
+
+    days = arr.astype("datetime64[D]").astype(np.int64)
+
+    return int(days) if days.ndim == 0 else days
+
+
+def to_date(days):
+
+    """
+    Day numbers to datetime64[D].
+    """
+
+    return np.asarray(days, dtype=np.int64).astype("datetime64[D]")
+
+
+class SettleCalendar:
+
+    """
+    Day and month tables for a range of settle dates.
+
+    Parameters
+    ------------
+    start  : first settle date
+    end    : last settle date
+    months : longest cash flow (months) served from a settle date in range
+
+    """
+
+    def __init__(self, start=START, end=END, months=MONTHS):
+
+        first = to_date(day_number(start)).astype("datetime64[M]")
+        last  = to_date(day_number(end)).astype("datetime64[M]") + months + 1
+
+        # Month table: first of every month through the last pay month
+        self.starts = (first + np.arange((last - first).astype(int) + 1)).astype("datetime64[D]").astype(np.int64)
+
+        # Day table: every day from the first month to the end of the range
+        self.first  = int(self.starts[0])
+        self.last   = day_number(end)
+        self.months = months
+
+        days        = to_date(np.arange(self.first, int(self.starts[-1])))
+        month       = days.astype("datetime64[M]")
+        year        = month.astype("datetime64[Y]")
+
+        self.month   = (month - month[0]).astype(np.int64)
+        self.accrued = (days - month.astype("datetime64[D]")).astype(np.int64)
+        self.y       = year.astype(np.int64) + 1970
+        self.m       = (month - year.astype("datetime64[M]")).astype(np.int64) + 1
+        self.d       = self.accrued + 1
+
+        self._pays   = {}
+
+    def covers(self, lo, hi, months=0) -> bool:
+
+        """
+        True when settle day numbers lo..hi and months of pay dates are in range.
+        """
+
+        return self.first <= lo and hi <= self.last and months <= self.months
+
+    def index(self, settle):
+
+        """
+        Row (scalar or array) of settle dates in the day tables.
+        """
+
+        row = day_number(settle) - self.first
+
+        if np.any(row < 0) or np.any(row >= len(self.month)):
+            raise KeyError(f"Settle date outside the calendar: {to_date(day_number(settle))}")
+
+        return row
+
+    def pays(self, delay) -> np.ndarray:
+
+        """
+        Pay date (day number) of every month for a delay convention (cached).
+        """
+
+        delay = int(delay)
+
+        if delay not in self._pays:
+            self._pays[delay] = self.starts + (delay - 30)
+
+        return self._pays[delay]
+
+    def pay_days(self, settle, delay, n) -> np.ndarray:
+
+        """
+        First n pay dates after settle as day numbers. An array of delays
+        (or settles) returns one row of pay dates per entry.
+        """
+
+        month = self.month[self.index(settle)]
+        ahead = np.arange(1, n+1)
+        delay = np.asarray(delay)
+
+        if delay.ndim == 0:
+            return self.pays(delay)[np.asarray(month)[..., None] + ahead]
+
+        return self.starts[np.asarray(month)[..., None] + ahead] + (delay[..., None] - 30)
+
+    def accrual(self, settle):
+
+        """
+        Days accrued from the first of the settle month.
+        """
+
+        return self.accrued[self.index(settle)]
+
+    def days_to_pay(self, settle, delay):
+
+        """
+        Days from settle to the first pay date.
+        """
+
+        row = self.index(settle)
+
+        return self.starts[self.month[row] + 1] + (np.asarray(delay) - 30) - (row + self.first)
+
+    def day_count(self, start, end, basis="30/360"):
+
+        """
+        Days between dates under 30/360 (bond basis) or actual (ACT).
+        """
+
+        start, end = day_number(start), day_number(end)
+
+        if basis == "ACT":
+            return end - start
+
+        if basis != "30/360":
+            raise ValueError(f"Unknown day count basis: {basis}")
+
+        a, b = self.index(start), self.index(end)
+        d1   = np.minimum(self.d[a], 30)
+        d2   = np.where((d1 == 30) & (self.d[b] == 31), 30, self.d[b])
+
+        return 360*(self.y[b] - self.y[a]) + 30*(self.m[b] - self.m[a]) + (d2 - d1)
+
+
+def covering(lo, hi=None, months=0) -> SettleCalendar:
+
+    """
+    Shared calendar covering settle dates lo..hi and months of pay dates,
+    rebuilt wider when a date falls outside it.
+    """
+
+    global _shared
+
+    lo = int(np.min(day_number(lo)))
+    hi = lo if hi is None else int(np.max(day_number(hi)))
+
+    if _shared is None or not _shared.covers(lo, hi, months):
+
+        if _shared is not None:
+            lo, hi = min(lo, _shared.first), max(hi, _shared.last)
+            months = max(months, _shared.months)
+
+        _shared = SettleCalendar(min(lo, day_number(START)), max(hi, day_number(END)), max(months, MONTHS))
+
+    return _shared
+
+
+# Unit testing
+if __name__ == "__main__":
+
+    import time
+    import pandas as pd
+    from pandas.tseries.offsets import DateOffset
+
+    start = time.time()
+    cal   = covering("3/8/2024")
+    print(f"built {len(cal.month)} days, {len(cal.starts)} months in {time.time() - start:.3f}s")
+
+    # Against the datetime arithmetic the pricing engine used to do per call
+    for settle in ("3/8/2024", "03/29/2024", "12/31/2023", "2/29/2024"):
+
+        ts    = pd.to_datetime(settle, format="%m/%d/%Y")
+        month = (ts + DateOffset(months=1)).to_pydatetime()
+        pay   = datetime.datetime(month.year, month.month, 54-29)
+
+        assert cal.accrual(settle) == (ts.to_pydatetime() - datetime.datetime(ts.year, ts.month, 1)).days
+        assert cal.days_to_pay(settle, 54) == (pay - ts.to_pydatetime()).days
+        assert to_date(cal.pay_days(settle, 54, 1)[0]) == np.datetime64(pay, "D")
+
+    print(cal.day_count("1/31/2024", "3/31/2024"), cal.day_count("1/31/2024", "3/31/2024", "ACT"))
+    print(to_date(cal.pay_days("3/8/2024", [24, 54], 3)))
@@ -0,0 +1,290 @@
+"""
+Short Rate Lattice Models
+
+Calibrated short rate lattices behind one pricing interface. Every lattice
+holds a node grid of rates (rows x N+1 columns), a mask of the nodes that
+carry cash flows and a rollback, so cash flow trees from tree_cash_flows
+price the same way on any model.
+
+Models:  HL  -> Ho-Lee, normal binomial tree
+         BDT -> Black-Derman-Toy, lognormal binomial tree
+         HW  -> Hull-White, mean-reverting normal trinomial tree
+
+Volatility is a scalar or a term structure with one value per period. All
+models are calibrated to zero coupon bond prices by forward induction on
+Arrow-Debreu state prices, one pass over the tree.
+
+Cash flows follow the rate_model_engine convention: the node at column c
+pays based on the rate at that node and is discounted with the rates of
+columns 0..c-1.
+
+"""
+import abc
+import math
+import numpy as np
+# Custom modules
+import rate_model_engine as rm
+
+# Hull-White branching switches to the edge at jmax = ceil(JMAX/(a*delta))
+JMAX = 0.184
+
+
+class ShortRateLattice(abc.ABC):
+
+    """
+    Common lattice interface.
+
+    Parameters
+    ------------
+    rates : node grid of short rates (rows x N+1 columns)
+    mask  : nodes that carry cash flows
+    delta : time step, with a value of 1 being annual
+    theta : calibrated drift (HL), median rate (BDT) or shift (HW) per period
+
+    """
+
+    model = None
+
+    def __init__(self, rates, mask, delta, theta):
+
+        self.rates = rates
+        self.mask  = mask
+        self.delta = delta
+        self.theta = theta
+
+    @property
+    def steps(self) -> int:
+        return self.rates.shape[-1]-1
+
+    def discount(self) -> np.ndarray:
+
+        """
+        One-step discount factors exp(-r*delta) for every node.
+        """
+
+        return np.exp(-1*self.rates*self.delta)
+
+    @abc.abstractmethod
+    def rollback(self, cf, terminal=0) -> np.ndarray:
+
+        """
+        Backward induction of a cash flow tree (or a stack of them).
+
+        Returns the price tree on the lattice grid.
+        """
+
+    def price(self, cf, terminal=0):
+
+        """
+        Root value of a cash flow tree (or one value per tree in a stack).
+        """
+
+        return self.rollback(cf, terminal)[..., 0, 0][()]
+
+
+class Binomial(ShortRateLattice):
+
+    """
+    Recombining binomial tree with up/down probabilities of 1/2 (HL, BDT).
+    """
+
+    def __init__(self, rates, delta, theta, model):
+
+        super().__init__(rates, rm.nodes(rates), delta, theta)
+        self.model = model
+
+    def rollback(self, cf, terminal=0) -> np.ndarray:
+        return rm.rollback(self.discount(), cf, terminal)
+
+
+class Trinomial(ShortRateLattice):
+
+    """
+    Recombining trinomial tree (HW).
+
+    Node (row, col) sits at level j = width[col] - row, so row 0 is the top
+    of each column. Each column keeps the rows of its three children and the
+    branch probabilities.
+
+    """
+
+    model = "HW"
+
+    def __init__(self, rates, width, children, probs, delta, theta):
+
+        rows = np.arange(rates.shape[0])[:, None]
+        mask = rows <= 2*np.asarray(width)[None, :]
+        mask[:, -1] = False
+
+        super().__init__(rates, mask, delta, theta)
+        self.width    = width
+        self.children = children
+        self.probs    = probs
+
+    def rollback(self, cf, terminal=0) -> np.ndarray:
+
+        cf   = np.asarray(cf, dtype=float)
+        n    = self.rates.shape[-1]
+        disc = self.discount()
+        tree = np.zeros(cf.shape[:-2] + self.rates.shape)
+
+        tree[..., :2*self.width[n-1]+1, n-1] = np.asarray(terminal, dtype=float)[..., None]
+
+        for col in reversed(range(0, n-1)):
+
+            size  = 2*self.width[col]+1
+            value = tree[..., :, col+1] + cf[..., :, col+1]
+            child = self.children[col]
+            prob  = self.probs[col]
+
+            tree[..., :size, col] = disc[:size, col]*(prob[0]*value[..., child[0]] + \
+                                                      prob[1]*value[..., child[1]] + \
+                                                      prob[2]*value[..., child[2]])
+
+        return tree
+
+
+def ho_lee(zcb, sigma, delta) -> Binomial:
+
+    """
+    Ho-Lee tree calibrated to zero coupon bond prices (1 x N).
+    """
+
+    r0, tree, theta = rm.build(zcb, sigma, delta, model="HL")
+
+    return Binomial(tree, delta, theta, "HL")
+
+
+def bdt(zcb, sigma, delta) -> Binomial:
+
+    """
+    Black-Derman-Toy tree calibrated to zero coupon bond prices (1 x N).
+    """
+
+    r0, tree, theta = rm.build(zcb, sigma, delta, model="BDT")
+
+    return Binomial(tree, delta, theta, "BDT")
+
+
+def hull_white(zcb, a, sigma, delta) -> Trinomial:
+
+    """
+    Hull-White trinomial tree calibrated to zero coupon bond prices (1 x N).
+
+    r = x + alpha, with dx = -a*x*dt + sigma*dW
+
+    Parameters
+    ------------
+    zcb   : zero coupon bond prices, column i matures after i+1 periods
+    a     : mean reversion speed (0 gives a normal tree without reversion)
+    sigma : scalar volatility or one volatility per period
+    delta : time step, with a value of 1 being annual
+
+    Level spacing in each column is sqrt(3V) for the variance V of the step
+    into it. Branching is centred on the node nearest the expected level and
+    is capped at jmax, which keeps the tree width bounded when a > 0.
+    Shifts alpha are solved in closed form by forward induction:
+
+        alpha = log(sum(Q*exp(-x*delta))/zcb)/delta
+
+    """
+
+    n     = zcb.shape[1]
+    vol   = rm.vols(sigma, n)
+    decay = math.exp(-a*delta)
+    var   = vol**2*((1-decay**2)/(2*a) if a > 0 else delta)
+    jmax  = math.ceil(JMAX/(a*delta)) if a > 0 else n
+
+    # Step into column i uses the period i volatility (the last step repeats it)
+    var   = np.append(var, var[-1])
+    dx    = np.sqrt(3*var)
+    width = np.zeros(n+1, dtype=int)
+    level = [np.zeros(1)]
+    children, probs = [], []
+
+    for i in range(n):
+
+        mean  = level[i]*decay
+        step  = dx[i+1]
+        full  = np.rint(mean/step).astype(int)
+        wide  = np.abs(full).max()+1
+        width[i+1] = min(wide, jmax)
+
+        # Falling vols can push edge nodes too far out to branch inside jmax
+        while True:
+            k, prob = branch(mean, step, var[i+1], np.clip(full, -(width[i+1]-1), width[i+1]-1))
+            if np.all(prob >= 0) or width[i+1] >= wide:
+                break
+            width[i+1] += 1
+
+        children.append(width[i+1] - (k + np.array([1, 0, -1])[:, None]))
+        probs.append(prob)
+        level.append((width[i+1] - np.arange(2*width[i+1]+1))*step)
+
+    # Forward induction for the shift of each column
+    rates = np.zeros([2*width.max()+1, n+1])
+    theta = np.zeros([n])
+    state = np.ones(1)
+
+    for i in range(n):
+
+        size     = 2*width[i]+1
+        theta[i] = np.log(np.sum(state*np.exp(-level[i]*delta))/zcb[0,i])/delta
+
+        rates[:size, i] = level[i] + theta[i]
+        parent = state*np.exp(-rates[:size, i]*delta)
+        state  = np.zeros(2*width[i+1]+1)
+
+        for b in range(3):
+            np.add.at(state, children[i][b], probs[i][b]*parent)
+
+    return Trinomial(rates, width, children, probs, delta, theta)
+
+
+def branch(mean, step, var, k):
+
+    """
+    Trinomial branch probabilities (up, middle, down) matching the mean and
+    variance of a step centred on level k of the next column.
+    """
+
+    eta = mean - k*step
+    m2  = (var + eta**2)/step**2
+
+    return (k, np.array([m2/2 + eta/(2*step), 1 - m2, m2/2 - eta/(2*step)]))
+
+
+def build(zcb, sigma, delta, model="HL", a=0.0) -> ShortRateLattice:
+
+    """
+    Calibrated lattice for a model name (HL, BDT or HW).
+    """
+
+    if model == "HL":
+        return ho_lee(zcb, sigma, delta)
+
+    elif model == "BDT":
+        return bdt(zcb, sigma, delta)
+
+    elif model == "HW":
+        return hull_white(zcb, a, sigma, delta)
+
+    raise ValueError(f"Unknown rate model: {model}")
+
+
+# Unit testing
+if __name__ == "__main__":
+
+    import curve_store as cs
+
+    store = cs.open_store()
+    zeros = store.lookup("zcb", "3/8/2024")[None, :120]
+    vols  = np.linspace(0.012, 0.008, 120)
+
+    for name, lattice in [("HL", build(zeros, vols, 1/12, "HL")),
+                          ("BDT", build(zeros, vols/0.045, 1/12, "BDT")),
+                          ("HW", build(zeros, vols, 1/12, "HW", a=0.05))]:
+
+        # Each calibrated lattice reprices its last zero coupon bond
+        price = lattice.price(np.zeros(lattice.rates.shape), 1)
+        print(name, lattice.rates.shape, price, price - zeros[0, -1])
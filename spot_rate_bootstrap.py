@@ -1,131 +1,315 @@
-"""
-Bootstrap Spot Rate Curve
-
-Code for parsing treasury data, bootstrapping a spot rate curve, and generating
-various charts.
-
-Author: Will Carpenter
-
-"""
-import numpy as np
-import pandas as pd
-import os
-import matplotlib.pyplot as plt
-from scipy import interpolate
-from scipy.interpolate import CubicSpline
-
-# Generate interpolated yields data
-def interpolate_yields(tsy, head) -> pd.DataFrame:
-    
-    """
-    Treasury Yields - Semi-Annual Frequency 
-    
-    Uses cubic spline interpolation.
-    
-    """
-    
-    ylds   = np.empty([1,62])
-    months = np.array([1,2,3,5,6,12,24,36,60,84,120,240,360])
-    x      = np.linspace(0,360,61)
-    
-    tsy_cols = list(tsy.columns.values)
-    cols     = list(head.columns.values)
-    
-    for i in range(len(tsy)):
-        
-        row = np.array(tsy.loc[i])
-        date = row[0:1]    
-        rates = row[1:]
-        
-        f = CubicSpline(months, rates)
-        interp = f(x)
-        
-        add  = np.append(date, interp)
-        ylds = np.vstack((ylds, add))
-        
-    ylds = pd.DataFrame(np.delete(ylds, 0, 0), columns=cols)  
-    
-    return ylds
-
-    
-def spot_rate_bootstrap(ylds, tsy, head) -> pd.DataFrame:
-    
-    cols     = list(head.columns.values)
-    spots = pd.DataFrame(np.zeros((ylds.shape[0], ylds.shape[1]), dtype=float), columns=cols)
-     
-    # No interpolation required here - shorter-term treasuries are ZCBs
-    spots['Date'] = tsy['Date']
-    spots['0']    = tsy['1']
-    spots['6']    = tsy['6']
-    spots['12']   = tsy['12']
-    
-    # Treasury bond assumptions for bootstrap; do not modify
-    face   = 100
-    delta  = 1/2 
-    
-    # Bootstrap methodology 
-    for row in range(0,spots.shape[0]):  
-        for col in range(0, spots.shape[1]):
-            
-            if col <= 3: continue # spot rates already defined for shorter bonds
-            
-            # Now solving for zero-coupon bond yield
-            int_cf = 0 
-            cpn    = ylds.iloc[row, col]  # interpolated coupon for par bond
-            
-            for i in range(2, col): # solve for intermediate cash flows
-                        
-                zcb    = 1/((1+spots.iloc[row, i]/100*delta)**(i-1)) 
-                int_cf = int_cf +cpn/100*delta*face*zcb
-                    
-            zero = ((face + face*cpn/100*delta)/(face - int_cf)) # algebra to solve for zero rate
-            zero = zero**(1/(col-1))
-            zero = (zero-1)*2
-            
-            spots.iloc[row, col] = zero*100
-    
-    return spots
-
-# Converting semi-annual spots to monthly using spline interpolation
-def spot_rates_monthly(spots):
-    
-    spots_monthly = np.empty([1,361])
-    months        = np.array(spots.columns.to_list())
-    months        = months[1:]
-    x             = np.linspace(0,360,360)
-    
-    for i in range(len(spots)):
-        
-        row   = np.array(spots.loc[i])
-        date  = row[0:1]
-        rates = row[1:]
-        
-        f = CubicSpline(months, rates)
-        interp = f(x)
-        
-        add = np.append(date, interp)
-        spots_monthly = np.vstack((spots_monthly, add))
-    
-    
-    months = ["Date"] + np.arange(1,361,1).tolist()
-    
-    spots_monthly = pd.DataFrame(np.delete(spots_monthly, 0, 0), columns=months)  
-
-    return spots_monthly     
-      
-if __name__ == "__main__":
-    
-    # Read in par-yield data via Github
-    tsy  = pd.read_csv("https://raw.githubusercontent.com/wrcarpenter/Z-Spread/main/Data/daily-treasury-rates.csv", header=0)
-    head = pd.read_csv("https://raw.githubusercontent.com/wrcarpenter/Z-Spread/main/Data/daily-treasury-spot-header.csv")
-    
-    # Generate data 
-    ylds          = interpolate_yields(tsy, head)
-    spots         = spot_rate_bootstrap(ylds, tsy, head)
-    spots_monthly = spot_rates_monthly(spots)
-    
-    # Save down relevant data 
-    # ylds.to_csv('C:/Users/wcarp/OneDrive/Desktop/Z-Spread/Data/ylds-semi-annual.csv', index=False)  
-    # spots.to_csv('C:/Users/wcarp/OneDrive/Desktop/Z-Spread/Data/spots-semi-annual.csv', index=False)
-    # spots_monthly.to_csv('C:/Users/wcarp/OneDrive/Desktop/Z-Spread/Data/spots-monthly.csv', index=False)
-
+"""
+Bootstrap Spot Rate Curve
+
+Code for parsing treasury data, bootstrapping a spot rate curve, and generating
+various charts.
+
+Author: Will Carpenter
+
+"""
+import numpy as np
+import pandas as pd
+import os
+import matplotlib.pyplot as plt
+from scipy import interpolate
+from scipy.interpolate import CubicSpline, PchipInterpolator
+from functools import lru_cache
+# Custom modules
+import kernels as kn
+
+# Generate interpolated yields data
+def interpolate_yields(tsy, head, method="cubic") -> pd.DataFrame:
+    
+    """
+    Treasury Yields - Semi-Annual Frequency 
+    
+    Uses cubic spline interpolation by default, fit for every date at once.
+    
+    """
+    
+    months = np.array([1,2,3,5,6,12,24,36,60,84,120,240,360])
+    x      = np.linspace(0,360,61)
+    
+    cols   = list(head.columns.values)
+    rates  = np.array(tsy.iloc[:, 1:], dtype=float)
+    
+    ylds = pd.DataFrame(interpolate_curves(months, rates, x, method), columns=cols[1:])
+    ylds.insert(0, cols[0], tsy['Date'])
+    
+    return ylds
+
+
+def interpolate_curves(x, y, xnew, method="cubic", reuse=True, out=None, freq=2) -> np.ndarray:
+    
+    """
+    Batched curve interpolation.
+    
+    Fits every curve (rows of y) in one pass and writes into a preallocated 
+    dates x len(xnew) array. 
+    
+    Methods:  cubic   -> not-a-knot cubic spline
+              pchip   -> monotone piecewise cubic (PCHIP)
+              linear  -> linear on rates
+              log_df  -> linear on log discount factors, rates compounded 
+                         freq times a year with x in months
+    
+    Cubic and linear interpolation are linear in the rates for fixed knots, 
+    so with reuse=True the knot system is solved once (cached weights for 
+    the knots and evaluation points) and each batch of dates is a single 
+    matrix product.
+    
+    """
+    
+    x    = np.asarray(x, dtype=float)
+    xnew = np.asarray(xnew, dtype=float)
+    y    = np.atleast_2d(np.asarray(y, dtype=float))
+    
+    if out is None:
+        out = np.empty((len(y), len(xnew)))
+    
+    if method == "pchip":
+        out[:] = PchipInterpolator(x, y, axis=1)(xnew)
+    
+    elif method == "log_df":
+        
+        # Zero tenors have no discount, so fall back to linear on rates there
+        log_df = -x/(12/freq)*np.log1p(y/(100*freq))
+        log_df = interpolate_curves(x, log_df, xnew, "linear", reuse)
+        pos    = xnew > 0
+        
+        out[:] = interpolate_curves(x, y, xnew, "linear", reuse)
+        out[:, pos] = np.expm1(-log_df[:, pos]*(12/freq)/xnew[pos])*100*freq
+    
+    elif method in ("cubic", "linear"):
+        if reuse:
+            np.matmul(y, spline_weights(tuple(x), tuple(xnew), method).T, out=out)
+        elif method == "cubic":
+            out[:] = CubicSpline(x, y, axis=1)(xnew)
+        else:
+            out[:] = [np.interp(xnew, x, row) for row in y]
+    
+    else:
+        raise ValueError(f"Unknown interpolation method: {method}")
+    
+    return out
+
+
+@lru_cache(maxsize=32)
+def spline_weights(x, xnew, method="cubic") -> np.ndarray:
+    
+    """
+    Interpolation weights for fixed knots and evaluation points.
+    
+    Interpolating the identity gives the len(xnew) x len(x) matrix mapping 
+    knot rates to interpolated rates.
+    
+    """
+    
+    x     = np.array(x)
+    xnew  = np.array(xnew)
+    basis = np.eye(len(x))
+    
+    if method == "cubic":
+        weights = CubicSpline(x, basis, axis=0)(xnew)
+    else:
+        weights = np.column_stack([np.interp(xnew, x, b) for b in basis])
+    
+    weights.flags.writeable = False
+    
+    return weights
+
+    
+def spot_rate_bootstrap(ylds, tsy, head) -> pd.DataFrame:
+    
+    """
+    Semi-Annual Spot Rate Curves - Bootstrapped
+    
+    Bootstraps every date at once; see bootstrap().
+    
+    """
+    
+    cols  = list(head.columns.values)
+    
+    # No interpolation required here - shorter-term treasuries are ZCBs
+    short = np.array(tsy[['1', '6', '12']], dtype=float)
+    par   = np.array(ylds.iloc[:, 1:], dtype=float)
+    
+    spots = pd.DataFrame(bootstrap(par, short), columns=cols[1:])
+    spots.insert(0, 'Date', tsy['Date'])
+    
+    return spots
+
+
+def bootstrap(par, short) -> np.ndarray:
+    
+    """
+    Vectorized spot rate bootstrap.
+    
+    Solves each semi-annual tenor for all dates (rows) at once. The running 
+    sum of discount factors of earlier tenors prices the intermediate 
+    coupons, so each tenor costs O(1) array operations.
+    
+    par   : dates x tenors matrix of semi-annual par yields (0, 6, ..., 360)
+    short : dates x 3 matrix of zero rates for the 0, 6 and 12 month points
+    
+    """
+    
+    if kn.enabled():
+        return kn.bootstrap(np.ascontiguousarray(par, dtype=float), \
+                            np.ascontiguousarray(short, dtype=float))
+    
+    # Treasury bond assumptions for bootstrap; do not modify
+    face   = 100
+    delta  = 1/2 
+    
+    spots  = np.zeros(par.shape)
+    spots[:, 0:3] = short      # spot rates already defined for shorter bonds
+    
+    # Sum of discount factors for coupons paid before each tenor
+    zcb_sum = np.zeros(len(par))
+    
+    for col in range(1, 3):
+        zcb_sum = zcb_sum + 1/((1+spots[:, col]/100*delta)**col)
+    
+    # Bootstrap methodology 
+    for col in range(3, par.shape[1]):
+        
+        cpn    = par[:, col]                           # coupon for par bond
+        int_cf = cpn/100*delta*face*zcb_sum            # intermediate cash flows
+        
+        zero = ((face + face*cpn/100*delta)/(face - int_cf)) # algebra to solve for zero rate
+        zero = zero**(1/col)
+        zero = (zero-1)*2
+        
+        spots[:, col] = zero*100
+        zcb_sum       = zcb_sum + 1/((1+spots[:, col]/100*delta)**col)
+    
+    return spots
+
+# Converting semi-annual spots to monthly using spline interpolation
+def spot_rates_monthly(spots, method="cubic"):
+    
+    """
+    Monthly Spot Rate Curves 
+    
+    Interpolates every semi-annual spot curve at once.
+    
+    """
+    
+    months = np.array(spots.columns[1:], dtype=float)
+    x      = np.linspace(0,360,360)
+    rates  = np.array(spots.iloc[:, 1:], dtype=float)
+    
+    spots_monthly = pd.DataFrame(interpolate_curves(months, rates, x, method), \
+                                 columns=np.arange(1,361,1).tolist())
+    spots_monthly.insert(0, "Date", spots['Date'])
+
+    return spots_monthly     
+      
+def read_par_yields(path, chunksize=500):
+    
+    """
+    Stream Treasury par yields from a local file in chunks.
+    
+    Yields (dates, tenors, rates) per chunk. Dates are a separate 
+    datetime64[D] index so the rates stay a float64 dates x tenors matrix.
+    
+    """
+    
+    for chunk in pd.read_csv(path, chunksize=chunksize):
+        
+        dates = pd.to_datetime(chunk['Date'], format="%m/%d/%Y").values.astype('datetime64[D]')
+        rates = np.array(chunk.drop('Date', axis=1), dtype=float)
+        
+        yield (dates, chunk.columns[1:].tolist(), rates)
+
+
+def build_curves(tenors, rates, method="cubic"):
+    
+    """
+    Par yields to curves for a block of dates.
+    
+    Returns float64 arrays of semi-annual par yields, semi-annual spot rates 
+    and monthly spot rates (dates x tenors).
+    
+    """
+    
+    months = np.array([1,2,3,5,6,12,24,36,60,84,120,240,360])
+    semi   = np.linspace(0,360,61)
+    short  = rates[:, [tenors.index('1'), tenors.index('6'), tenors.index('12')]]
+    
+    ylds    = interpolate_curves(months, rates, semi, method)
+    spots   = bootstrap(ylds, short)
+    monthly = interpolate_curves(semi, spots, np.linspace(0,360,360), method)
+    
+    return (ylds, spots, monthly)
+
+
+def bootstrap_file(src, monthly, spots=None, ylds=None, chunksize=500, method="cubic") -> int:
+    
+    """
+    Streaming curve pipeline.
+    
+    Reads par yields from src in chunks, interpolates and bootstraps each 
+    chunk and appends the monthly spot curves (and optionally the 
+    semi-annual spot and par yield curves) to csv files in the same layout 
+    as the Data folder. Memory is bounded by the chunk size regardless of 
+    history length.
+    
+    Returns the number of dates processed.
+    
+    """
+    
+    semi  = [str(m) for m in range(0,361,6)]
+    outs  = [(ylds, semi), (spots, semi), (monthly, list(range(1,361)))]
+    count = 0
+    
+    for dates, tenors, rates in read_par_yields(src, chunksize):
+        
+        curves = build_curves(tenors, rates, method)
+        index  = format_dates(dates)
+        
+        for (path, cols), curve in zip(outs, curves):
+            
+            if path is None:
+                continue
+            
+            frame = pd.DataFrame(curve, columns=cols)
+            frame.insert(0, 'Date', index)
+            frame.to_csv(path, mode='w' if count == 0 else 'a', header=(count == 0), index=False)
+        
+        count = count + len(dates)
+    
+    return count
+
+
+def format_dates(dates) -> np.ndarray:
+    
+    """
+    datetime64 dates to the m/d/yyyy strings used in the Data folder.
+    """
+    
+    dates = pd.DatetimeIndex(dates)
+    
+    return (dates.month.astype(str) + '/' + dates.day.astype(str) + '/' + dates.year.astype(str)).values
+
+      
+if __name__ == "__main__":
+    
+    import argparse
+    
+    # Stream local par-yield data through the curve pipeline. Curves go to an
+    # output directory so the tracked files in Data are never overwritten.
+    parser = argparse.ArgumentParser(description="Bootstrap spot curves from a par-yield file")
+    parser.add_argument("source", nargs="?", default=os.path.join("Data", "daily-treasury-rates.csv"))
+    parser.add_argument("--out", default="Output", help="directory for the curve files")
+    args = parser.parse_args()
+    
+    os.makedirs(args.out, exist_ok=True)
+    
+    rows = bootstrap_file(args.source, 
+                          monthly = os.path.join(args.out, 'spots-monthly.csv'), 
+                          spots   = os.path.join(args.out, 'spots-semi-annual.csv'),
+                          ylds    = os.path.join(args.out, 'ylds-semi-annual.csv'))
+    
+    print(f"{rows} dates written to {args.out}")
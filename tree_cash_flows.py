@@ -0,0 +1,136 @@
+"""
+Tree Cash Flow Generators
+
+Builds cash flow trees for rate tree pricing with masked NumPy operations.
+Every generator takes a scalar strike (one N+1 x N+1 tree) or an array of
+strikes (a K x N+1 x N+1 stack), so a full strike ladder is one build and
+one rollback through rate_model_engine.priceTree.
+
+Payoffs are the rate_model_engine cf_* generators: the node at column c
+pays based on the rate at that node, for every column except the last.
+
+Rates are a dense rate tree or a calibrated lattice from short_rate_models
+(Ho-Lee, BDT or Hull-White), whose node grid and mask are used instead.
+
+"""
+import numpy as np
+# Custom modules
+import rate_model_engine as model
+import short_rate_models as srm
+
+
+def grid(rates):
+
+    '''
+    Node rates and cash flow mask of a rate tree or lattice
+    '''
+
+    if isinstance(rates, srm.ShortRateLattice):
+        return (rates.rates, rates.mask)
+
+    return (rates, model.nodes(rates))
+
+
+def rollback(rates, cf, delta):
+
+    '''
+    Price tree of a cash flow tree on a rate tree or lattice
+    '''
+
+    if isinstance(rates, srm.ShortRateLattice):
+        return rates.rollback(cf, 0)
+
+    return model.rollback(model.discountTree(rates, delta), cf, 0)
+
+
+def cap(rates, strike, delta, notion):
+
+    '''
+    Cap cash flows - pays rate above strike
+    '''
+
+    rates, mask = grid(rates)
+
+    return model.cf_cap(rates, strike, delta, notion, 0, mask)
+
+
+def floor(rates, strike, delta, notion):
+
+    '''
+    Floor cash flows - pays rate below strike
+    '''
+
+    rates, mask = grid(rates)
+
+    return model.cf_floor(rates, strike, delta, notion, 0, mask)
+
+
+def bond(rates, cpn, delta, notion):
+
+    '''
+    Fixed coupon bond cash flows (principal is the pricing terminal value)
+    '''
+
+    rates, mask = grid(rates)
+
+    return model.cf_bond(rates, 0, delta, notion, cpn, mask)
+
+
+def swap(rates, strike, delta, notion, payer=True):
+
+    '''
+    Swap cash flows
+
+    payer    -> pay fixed (strike), receive floating
+    receiver -> receive fixed, pay floating
+    '''
+
+    rates, mask = grid(rates)
+    cf = model.cf_swap(rates, strike, delta, notion, 0, mask)
+
+    return -cf if payer else cf
+
+
+def collar(rates, cap_strike, floor_strike, delta, notion):
+
+    '''
+    Collar cash flows - long a cap and short a floor
+
+    Cap and floor strikes broadcast against each other, so paired arrays
+    give one collar per pair.
+    '''
+
+    cap_strike, floor_strike = np.broadcast_arrays(cap_strike, floor_strike)
+
+    return cap(rates, cap_strike, delta, notion) - floor(rates, floor_strike, delta, notion)
+
+
+def swaption(rates, strike, delta, notion, expiry, payer=True):
+
+    '''
+    European swaption cash flows
+
+    Exercise at tree column expiry into a swap paying from the following
+    column to the end of the tree. The underlying swap is rolled back to the
+    expiry column and the cash flow tree carries max(swap value, 0) on the
+    expiry nodes only.
+
+    Expiry must leave at least one swap payment before the last paying
+    column (the column before maturity), so 1 <= expiry < maturity - 1.
+    '''
+
+    maturity = grid(rates)[0].shape[-1] - 1
+
+    if not 1 <= expiry < maturity - 1:
+        raise ValueError(f"Swaption expiry must be between 1 and {maturity-2} for a {maturity} step tree, got {expiry}")
+
+    swaps = swap(rates, strike, delta, notion, payer)
+    swaps[..., :, :expiry+1] = 0
+
+    value = rollback(rates, swaps, delta)
+    live  = grid(rates)[1][:, expiry]
+    cf    = np.zeros(swaps.shape)
+
+    cf[..., live, expiry] = np.maximum(value[..., live, expiry], 0)
+
+    return cf
@@ -1,172 +1,605 @@
-"""
-Bond Pricing Engine - Z-Spread, I-Spread, Duration
-Author: William Carpenter
-
-Also contains engine for I-spread (interpolated spread). 
-
-"""
-# Custom modules
-import mortgage_cash_flow as mbs  # custom module cash flow engine
-import bond_price as px
-# Python packages
-import datetime
-from scipy.optimize import newton
-import numpy as np
-import pandas as pd
-from pandas.tseries.offsets import DateOffset
-    
-def price(cf, curve, settle, spread, typ) -> float:
-    
-    """
-    Bond Pricing Engine.
-    
-    Currently can solve for price given a bond I-spread or Z-Spread.
-    Assumes provided cashflows are monthly. 
-    
-
-    Spread Types:
-        Z-Spread -> spot rate yield spread
-        I-Spread -> interpolated treasuries
-    
-    Parameters
-    ------------
-    cf     : dataframe of cash flows
-    curve  : yield or spot rate curve
-    settle : bond settle date     
-    spread : Z or I spread
-    typ    : defining if Z or I spread
-    
-    Returns:
-    ------------
-    Bond dollar price as a float
-    
-    """        
-    # Cashflow characteristics given in provided dataframe 
-    rate     = cf["Rate"].loc[0]
-    curr     = cf["Starting Balance"].loc[0]
-    delay    = cf["Pay Delay"].loc[0]
-
-    # Handling settle dates and accrued interest 
-    settle   = pd.to_datetime(settle, format="%m/%d/%Y")
-    month    = (settle + DateOffset(months=1)).to_pydatetime() # this works 
-    pay      = datetime.datetime(month.year, month.month, delay-29)  
-
-    accrued  = (settle.to_pydatetime() - datetime.datetime(settle.year, settle.month, 1)).days
-    days_pay = (pay - settle.to_pydatetime()).days
-    accr_int = accrued/360*rate/100*curr
-        
-    mey  = monthly_equiv_yld(settle, cf, curve, spread)
-    
-    months   = np.array((cf["Period"] - 1).astype(int))
-    cf_flow  = np.array((cf["Cash Flow"]).astype(float))
-    
-    # Z-Spread calculation 
-    if typ == "Z":
-        
-        # Extract correctly sized spot curve - assume monthly cashflows
-        spots  = np.array(curve.iloc[0,0:len(cf)])
-        # Calculate z rates on each point of the spot curve
-        z_rate = spots + spread/100
-        # Calculate discount rates
-        z_zcb  = 1/((1+z_rate/(12*100))**(months))
-        # Price bond 
-        price  = (np.sum(cf_flow*z_zcb)-accr_int)*\
-                  100/curr*1/(1+mey/100*days_pay/360)
-                  
-    # I-Spread calculation 
-    elif typ == "I":
-         
-        price = (np.sum(cf_flow/((1+mey/(12*100))**(months)))\
-                  -accr_int)*100/curr*1/(1+mey/100*days_pay/360)
-    
-    return price
-
-
-def monthly_equiv_yld(settle, cf, curve, spread) -> float:
-    
-    tenor = mbs.wal(settle, cf)*12
-    m     = pd.DataFrame(curve.columns.values.astype(int), columns=["Months"])
-    
-    # Points for interpolation
-    index = m["Months"].gt(tenor).idxmax()
-    m_ub  = m["Months"].iloc[index]   
-    m_lb  = m["Months"].iloc[index-1]
-    y_ub  = curve.iloc[0,index]
-    y_lb  = curve.iloc[0,index-1]
-    # Linear interpolation
-    intrp = y_lb + (tenor - m_lb)*((y_ub - y_lb)/(m_ub - m_lb))
-    
-    # Bond equivalent yield at WAL point 
-    bond_equiv    = intrp + spread/100
-    # Monthly equivalent yield
-    monthly_equiv = 12*((1+bond_equiv/(2*100))**(2/12)-1)*100
-    
-    return monthly_equiv
-     
-    
-def spread_solver(spread, cf, curve, settle, px, typ):
-        
-    """
-    Newton Root Finding Function - Solving for bond spread
-    """
-    
-    solver = price(cf, curve, settle, spread, typ)  # using a spread to solve for spread   
-    
-    return (solver - px)
-
-    
-def spread(cf, curve, settle, px, typ) -> float:
-    
-    """
-    Bond Spread
-    """    
-    # Solver to calculate Z-spread
-    # Constants
-    s0    = 100
-    miter = 1000
-    
-    sp = newton(spread_solver, s0, args=(cf, curve, settle, px, typ), maxiter=miter)
-    
-    return sp
-    
-
-def duration(settle, cf, curve, spread) -> float:
-    
-    # Solve for monthly equivalent yield
-    mey = monthly_equiv_yld(settle, cf, curve, spread)
-        
-    # Formula 
-    dur = np.sum(net_flow/((1+mey/(12*100))**(months))*1/(1+mey/100*days_to_pay/360)*cf_table[:,6] / np.sum(net_flow/((1+mey/(12*100))**(months))*1/(1+mey/100*days_to_pay/360))) 
-    
-    return dur
-
-# Unit Testing 
-if __name__ == "__main__":
-    
-    # Get data
-    ylds  = pd.read_csv("https://raw.githubusercontent.com/wrcarpenter/Z-Spread/main/Data/ylds-semi-annual.csv")
-    spots = pd.read_csv("https://raw.githubusercontent.com/wrcarpenter/Z-Spread/main/Data/spots-monthly.csv")
-    
-    # I-curve
-    i_curve = ylds.loc[ylds['Date']=='3/8/2024']
-    i_curve = i_curve.drop("Date", axis=1)
-    
-    # Z-curve
-    z_curve = spots.loc[spots['Date']=='3/8/2024']
-    z_curve = z_curve.drop("Date", axis=1)
-    
-    # Cashflows
-    cf_7cpr     = mbs.cash_flow('03/29/2024', 6.50, 360, 360, 240, 0, 54,  7, 'CPR', 1000000)
-    cf_7cpr_wal = mbs.wal('03/29/2024', cf_7cpr)
-    
-    # Getting prices
-    px_i      = price(cf_7cpr, i_curve, "03/29/2024", 172, "I")
-    px_z      = price(cf_7cpr, z_curve, "03/29/2024", 140, "Z")
-    
-    print(px_i)
-    print(px_z)
-
-
-
-
-
+"""
+Bond Pricing Engine - Z-Spread, I-Spread, Duration
+Author: William Carpenter
+
+Also contains engine for I-spread (interpolated spread). 
+
+"""
+# Custom modules
+import mortgage_cash_flow as mbs  # custom module cash flow engine
+import bond_price as px
+import discount_curve as dc       # cached discount curve object
+import curve_store as cs          # memory-mapped curve history
+import settle_calendar as sc      # precomputed settle and pay dates
+# Python packages
+import os
+import numpy as np
+import pandas as pd
+    
+def price(cf, curve, settle, spread, typ) -> float:
+    
+    """
+    Bond Pricing Engine.
+    
+    Currently can solve for price given a bond I-spread or Z-Spread.
+    Assumes provided cashflows are monthly. 
+    
+
+    Spread Types:
+        Z-Spread -> spot rate yield spread
+        I-Spread -> interpolated treasuries
+    
+    Parameters
+    ------------
+    cf     : dataframe of cash flows
+    curve  : yield or spot rate curve (dataframe or discount_curve.Curve)
+    settle : bond settle date     
+    spread : Z or I spread
+    typ    : defining if Z or I spread
+    
+    Returns:
+    ------------
+    Bond dollar price as a float
+    
+    """        
+    
+    return price_terms(spread_terms(cf, curve, settle, typ), spread)
+
+
+def spread_terms(cf, curve, settle, typ) -> dict:
+    
+    """
+    Precompute everything in a bond price that does not depend on spread.
+    
+    Cash flow vector, month indices, spot rates (Z), accrued interest, 
+    days to first pay and the curve yield at the WAL tenor are built once 
+    so that repricing at a new spread is pure array arithmetic.
+    
+    """
+    
+    # Cashflow characteristics given in provided dataframe 
+    rate     = cf["Rate"].loc[0]
+    curr     = cf["Starting Balance"].loc[0]
+    delay    = cf["Pay Delay"].loc[0]
+
+    # Settle dates and accrued interest from the settle calendar 
+    cal      = sc.covering(settle)
+    accrued  = int(cal.accrual(settle))
+    days_pay = int(cal.days_to_pay(settle, delay))
+    accr_int = accrued/360*rate/100*curr
+    
+    tenor    = mbs.wal(settle, cf)*12
+    curve    = dc.as_curve(curve)
+    
+    terms = {"typ"      : typ,
+             "curve"    : curve,
+             "months"   : np.array((cf["Period"] - 1).astype(int)),
+             "flows"    : np.array((cf["Cash Flow"]).astype(float)),
+             "spots"    : None,
+             "accrued"  : accr_int,
+             "curr"     : curr,
+             "days_pay" : days_pay,
+             "yld"      : curve.interp(tenor),
+             "tenor"    : tenor,
+             "tenors"   : curve.tenors[:len(cf)]}
+    
+    # Extract correctly sized spot curve - assume monthly cashflows
+    if typ == "Z":
+        terms["spots"] = curve.spots(len(cf))
+    
+    return terms
+
+
+def price_terms(terms, spread, order=0):
+    
+    """
+    Price a bond from precomputed spread terms.
+    
+    With order=2 also returns the first and second derivatives of price 
+    with respect to spread (per bp), computed analytically.
+    
+    Spread may be an array; terms arrays may carry a leading bond axis with 
+    months on the last axis.
+    
+    """
+    
+    spread = np.asarray(spread, dtype=float)
+    months = terms["months"]
+    scale  = 100/terms["curr"]
+    
+    # Monthly equivalent yield at the WAL point
+    base  = 1 + (terms["yld"] + spread/100)/(2*100)
+    mey   = 12*(base**(2/12)-1)*100
+    
+    # Discount to settle for days to first pay
+    k     = terms["days_pay"]/360/100
+    disc  = 1/(1+mey*k)
+    
+    # Single Z price off a curve object uses its cached discount factors
+    if terms["typ"] == "Z" and terms.get("curve") is not None and not order and not spread.ndim:
+        zcb = terms["curve"].discount(spread, len(months))
+    
+    else:
+        # Z-Spread calculation - z rates on each point of the spot curve
+        if terms["typ"] == "Z":
+            rate = 1+(terms["spots"] + spread[..., None]/100)/(12*100)
+        
+        # I-Spread calculation - monthly equivalent yield on every cash flow
+        elif terms["typ"] == "I":
+            rate = 1+mey[..., None]/(12*100)
+        
+        zcb = 1/(rate**months)
+    
+    value = _dot(terms["flows"], zcb) - terms["accrued"]
+    price = value*scale*disc
+    
+    if not order:
+        return price
+    
+    # Derivatives of the monthly equivalent yield and discount w.r.t. spread
+    mey1  = 0.01*base**(-5/6)
+    mey2  = -5/6*0.01/20000*base**(-11/6)
+    disc1 = -k*mey1*disc**2
+    disc2 = -k*mey2*disc**2 + 2*k**2*mey1**2*disc**3
+    
+    zcb   = zcb/rate
+    sum1  = _dot(terms["flows"]*months, zcb)
+    sum2  = _dot(terms["flows"]*months*(months+1), zcb/rate)
+    
+    if terms["typ"] == "Z":
+        c      = 1/(12*100*100)
+        value1 = -c*sum1
+        value2 = c**2*sum2
+        
+    elif terms["typ"] == "I":
+        c      = mey1/(12*100)
+        value1 = -c*sum1
+        value2 = c**2*sum2 - mey2/(12*100)*sum1
+    
+    price1 = scale*(value1*disc + value*disc1)
+    price2 = scale*(value2*disc + 2*value1*disc1 + value*disc2)
+    
+    return (price, price1, price2)
+
+
+def _dot(a, b):
+    
+    # Sum of products along the month axis
+    if a.ndim == 1 and b.ndim == 1:
+        return a @ b
+    
+    return np.einsum('...m,...m->...', a, b)
+
+
+def monthly_equiv_yld(settle, cf, curve, spread) -> float:
+    
+    tenor = mbs.wal(settle, cf)*12
+    
+    # Bond equivalent yield at WAL point 
+    bond_equiv    = curve_yield(curve, tenor) + spread/100
+    # Monthly equivalent yield
+    monthly_equiv = 12*((1+bond_equiv/(2*100))**(2/12)-1)*100
+    
+    return monthly_equiv
+
+
+def curve_yield(curve, tenor) -> float:
+    
+    """
+    Linearly interpolated curve yield at a tenor (months).
+    """
+    
+    return dc.as_curve(curve).interp(tenor)
+     
+    
+def spread(cf, curve, settle, px, typ) -> float:
+    
+    """
+    Bond Spread
+    """    
+    
+    return solve_spread(spread_terms(cf, curve, settle, typ), px)
+
+
+def solve_spread(terms, px, s0=100, tol=1e-10, maxiter=100) -> float:
+    
+    """
+    Bracketed Halley solver for bond spread.
+    
+    Uses the analytic price derivatives from precomputed spread terms. 
+    Price falls as spread rises, so every evaluation tightens a bracket 
+    around the root; steps that leave the bracket fall back to bisection 
+    (or bracket expansion until the root is enclosed), so the solver 
+    always converges.
+    
+    """
+    
+    lo, hi = -np.inf, np.inf
+    s      = float(s0)
+    
+    for i in range(maxiter):
+        
+        p, p1, p2 = price_terms(terms, s, order=2)
+        f = float(p) - px
+        
+        if abs(f) < tol:
+            return s
+        
+        # Price above target -> spread too low 
+        if f > 0: lo = s
+        else:     hi = s
+        
+        # Halley step
+        step  = 2*f*p1/(2*p1**2 - f*p2)
+        s_new = s - float(step)
+        
+        if not (lo < s_new < hi):
+            if np.isfinite(lo) and np.isfinite(hi):
+                s_new = (lo + hi)/2
+            else:
+                width = 2*max(abs(s - s0), 100)
+                s_new = s + width if f > 0 else s - width
+        
+        if abs(s_new - s) < tol:
+            return s_new
+        
+        s = s_new
+    
+    raise RuntimeError(f"Spread solver failed to converge after {maxiter} iterations")
+
+
+def stack_cash_flows(cfs) -> dict:
+    
+    """
+    Stack cash flow dataframes into padded bonds x months matrices.
+    
+    Returns a dictionary of cash flow and principal matrices (zero padded 
+    past each bond's last payment) plus coupon, current balance and pay 
+    delay arrays, ready for batch_terms.
+    
+    """
+    
+    n     = max(len(cf) for cf in cfs)
+    flows = np.zeros([len(cfs), n])
+    princ = np.zeros([len(cfs), n])
+    
+    for i, cf in enumerate(cfs):
+        flows[i, :len(cf)] = cf["Cash Flow"].astype(float)
+        princ[i, :len(cf)] = (cf["Scheduled Principal"] + cf["Unscheduled Principal"]).astype(float)
+    
+    return {"flows"     : flows,
+            "principal" : princ,
+            "rate"      : np.array([cf["Rate"].iloc[0] for cf in cfs], dtype=float),
+            "curr"      : np.array([cf["Starting Balance"].iloc[0] for cf in cfs], dtype=float),
+            "delay"     : np.array([cf["Pay Delay"].iloc[0] for cf in cfs], dtype=int)}
+
+
+def batch_terms(flows, principal, settle, curve, typ, rate, curr, delay) -> dict:
+    
+    """
+    Precompute spread terms for a whole portfolio at once.
+    
+    Parameters
+    ------------
+    flows     : bonds x months cash flow matrix (zero padded)
+    principal : bonds x months principal matrix, used for WAL
+    settle    : settle date, or one settle date per bond
+    curve     : yield or spot rate curve, one row shared or one row per bond 
+                (a discount_curve.Curve is treated as one shared row)
+    typ       : defining if Z or I spread
+    rate      : coupons
+    curr      : current balances
+    delay     : pay delays (days)
+    
+    Returns:
+    ------------
+    Dictionary of spread terms with a leading bond axis, accepted by 
+    price_terms and spread_batch
+    
+    """
+    
+    flows  = np.asarray(flows, dtype=float)
+    bonds, n = flows.shape
+    rate   = np.broadcast_to(np.asarray(rate, dtype=float), bonds)
+    curr   = np.broadcast_to(np.asarray(curr, dtype=float), bonds)
+    delay  = np.broadcast_to(np.asarray(delay), bonds)
+    
+    # Settle dates and accrued interest as day number arrays 
+    settle = np.broadcast_to(sc.day_number(np.atleast_1d(settle)), bonds)
+    cal    = sc.covering(settle.min(), settle.max(), n)
+    dates  = cal.pay_days(settle, delay, n)
+    
+    accrued  = cal.accrual(settle).astype(float)
+    days_pay = (dates[:, 0] - settle).astype(float)
+    days     = (dates - settle[:, None]).astype(float)
+    tenor    = mbs.wal_array(days, np.asarray(principal, dtype=float))*12
+    
+    # Linear interpolation of each bond's curve at its WAL tenor
+    if isinstance(curve, dc.Curve):
+        tenors = curve.tenors
+        values = curve.rates[None, :]
+    else:
+        tenors = curve.columns.values.astype(int)
+        values = np.asarray(curve, dtype=float)
+    
+    row    = np.arange(bonds) if len(values) == bonds else np.zeros(bonds, dtype=int)
+    index  = np.clip(np.searchsorted(tenors, tenor, side="right"), 1, len(tenors)-1)
+    y_lb   = values[row, index-1]
+    y_ub   = values[row, index]
+    m_lb   = tenors[index-1]
+    m_ub   = tenors[index]
+    
+    terms = {"typ"      : typ,
+             "months"   : np.arange(n),
+             "flows"    : flows,
+             "spots"    : None,
+             "accrued"  : accrued/360*rate/100*curr,
+             "curr"     : curr,
+             "days_pay" : days_pay,
+             "yld"      : y_lb + (tenor - m_lb)*((y_ub - y_lb)/(m_ub - m_lb)),
+             "tenor"    : tenor,
+             "tenors"   : np.asarray(tenors, dtype=float)[0:n]}
+    
+    if typ == "Z":
+        terms["spots"] = values[:, 0:n]
+    
+    return terms
+
+
+def spread_batch(terms, px, s0=100, tol=1e-10, maxiter=100):
+    
+    """
+    Portfolio spread solver.
+    
+    Runs the bracketed Halley iteration of solve_spread on every bond at 
+    once. Converged bonds drop out of the active set, so later iterations 
+    only reprice the bonds still moving.
+    
+    Bonds that do not converge within maxiter, or whose price cannot be 
+    evaluated, are flagged as failures with a NaN spread.
+    
+    Returns
+    ------------
+    Tuple of arrays: spreads, iteration counts, failure flags
+    
+    """
+    
+    px     = np.asarray(px, dtype=float)
+    bonds  = len(px)
+    s      = np.full(bonds, float(s0))
+    lo     = np.full(bonds, -np.inf)
+    hi     = np.full(bonds, np.inf)
+    iters  = np.zeros(bonds, dtype=int)
+    done   = np.zeros(bonds, dtype=bool)
+    stop   = ~np.isfinite(px)     # bonds with no usable price are failures
+    
+    for i in range(maxiter):
+        
+        active = np.flatnonzero(~done & ~stop)
+        
+        if not active.size:
+            break
+        
+        sub = _take(terms, active, bonds)
+        x   = s[active]
+        
+        # Prices unreachable by any spread overflow as the bracket expands
+        with np.errstate(over='ignore', divide='ignore', invalid='ignore'):
+            p, p1, p2 = price_terms(sub, x, order=2)
+            f     = p - px[active]
+            x_new = x - 2*f*p1/(2*p1**2 - f*p2)
+        
+        iters[active] += 1
+        stop[active] = ~np.isfinite(f)
+        
+        # Price above target -> spread too low 
+        lo[active] = np.where(f > 0, x, lo[active])
+        hi[active] = np.where(f < 0, x, hi[active])
+        
+        # Bisection or bracket expansion when the Halley step leaves the bracket
+        outside = ~((lo[active] < x_new) & (x_new < hi[active]))
+        bounded = np.isfinite(lo[active]) & np.isfinite(hi[active])
+        width   = 2*np.maximum(np.abs(x - s0), 100)
+        x_new   = np.where(outside & bounded, (lo[active] + hi[active])/2, x_new)
+        x_new   = np.where(outside & ~bounded, np.where(f > 0, x + width, x - width), x_new)
+        
+        hit       = np.abs(f) < tol
+        s[active] = np.where(hit, x, x_new)
+        done[active] = hit | (np.abs(x_new - x) < tol)
+    
+    s[~done] = np.nan
+    
+    return (s, iters, ~done)
+
+
+def spread_quotes(quotes, terms, ids, column="Price", key="Id", **kw):
+    
+    """
+    Spreads for a stream of price quotes, one spread_batch per chunk.
+    
+    Parameters
+    ------------
+    quotes : quote file path, or dataframe chunks with decimal prices 
+             (bond_price.read_quotes)
+    terms  : batch_terms of the quoted bonds
+    ids    : bond identifiers in terms order (matched against the key column)
+    column : price column
+    key    : bond identifier column
+    kw     : passed to spread_batch
+    
+    Yields each chunk with Spread, Iterations and Failed columns; quotes for 
+    bonds not in ids, or without a usable price, are flagged as failures 
+    with a NaN spread.
+    
+    """
+    
+    if isinstance(quotes, (str, os.PathLike)):
+        quotes = px.read_quotes(quotes, (column,))
+    
+    bonds = len(terms["flows"])
+    index = pd.Index(ids)
+    
+    for chunk in quotes:
+        
+        row    = index.get_indexer(chunk[key])
+        known  = np.flatnonzero(row >= 0)
+        spread = np.full(len(chunk), np.nan)
+        iters  = np.zeros(len(chunk), dtype=int)
+        failed = np.ones(len(chunk), dtype=bool)
+        
+        # Solve each distinct (bond, price) pair once - dealer runs repeat quotes
+        if known.size:
+            pairs, inv = np.unique(np.column_stack((row[known], chunk[column].to_numpy(dtype=float)[known])), \
+                                   axis=0, return_inverse=True)
+            solved = spread_batch(_take(terms, pairs[:, 0].astype(int), bonds), pairs[:, 1], **kw)
+            spread[known], iters[known], failed[known] = (x[inv.ravel()] for x in solved)
+        
+        spread[failed] = np.nan
+        
+        yield chunk.assign(Spread=spread, Iterations=iters, Failed=failed)
+
+
+def spread_history(cf, curves, px, settle=None, typ="Z", dates=None) -> pd.DataFrame:
+    
+    """
+    Spread history of one bond solved against many curve dates at once.
+    
+    The cash flow is held fixed and priced as of each settle date: accrued 
+    interest, days to first pay and the WAL tenor are computed per date as 
+    arrays (batch_terms), then every date is solved in one spread_batch. 
+    As in batch_terms, pay dates roll with each settle date - the first 
+    cash flow pays in the month after settle.
+    
+    Parameters
+    ------------
+    cf     : dataframe of cash flows
+    curves : full curve history - a dataframe with a Date column (as in the 
+             Data folder) or (dates, tenors, rates) from CurveStore.load
+    px     : bond prices, one per curve date used
+    settle : settle dates, one per curve date (defaults to the curve dates)
+    typ    : defining if Z or I spread
+    dates  : curve dates to use (defaults to every date in the history)
+    
+    Returns:
+    ------------
+    Dataframe of curve date, settle date, price, spread, WAL (years), 
+    iterations and failure flag per date
+    
+    """
+    
+    curve_dates, tenors, rates = curve_matrix(curves)
+    
+    if dates is None:
+        rows = np.arange(len(curve_dates))
+    else:
+        dates = sc.to_date(sc.day_number(np.atleast_1d(dates)))
+        rows  = pd.Index(curve_dates).get_indexer(dates)
+        
+        if np.any(rows < 0):
+            raise KeyError(f"No curve for {dates[rows < 0]}")
+    
+    count  = len(rows)
+    settle = curve_dates[rows] if settle is None else settle
+    flows  = np.array(cf["Cash Flow"], dtype=float)
+    princ  = np.array(cf["Scheduled Principal"] + cf["Unscheduled Principal"], dtype=float)
+    curve  = pd.DataFrame(rates[rows], columns=tenors)
+    
+    terms  = batch_terms(np.broadcast_to(flows, (count, len(flows))), 
+                         np.broadcast_to(princ, (count, len(princ))), 
+                         settle, curve, typ, cf["Rate"].iloc[0], 
+                         cf["Starting Balance"].iloc[0], cf["Pay Delay"].iloc[0])
+    
+    px     = np.broadcast_to(np.asarray(px, dtype=float), count)
+    solved = spread_batch(terms, px)
+    settle = sc.to_date(np.broadcast_to(sc.day_number(np.atleast_1d(settle)), count))
+    
+    return pd.DataFrame({"Date"       : curve_dates[rows],
+                         "Settle"     : settle,
+                         "Price"      : px,
+                         "Spread"     : solved[0],
+                         "WAL"        : terms["tenor"]/12,
+                         "Iterations" : solved[1],
+                         "Failed"     : solved[2]})
+
+
+def curve_matrix(curves) -> tuple:
+    
+    """
+    Curve history as (dates, tenors, rates) arrays.
+    """
+    
+    if isinstance(curves, tuple):
+        dates, tenors, rates = curves
+        return (np.asarray(dates, dtype='datetime64[D]'), np.asarray(tenors), np.asarray(rates, dtype=float))
+    
+    dates  = pd.to_datetime(curves["Date"], format="%m/%d/%Y").values.astype('datetime64[D]')
+    values = curves.drop("Date", axis=1)
+    
+    return (dates, values.columns.values.astype(float), np.array(values, dtype=float))
+
+
+def _take(terms, index, bonds) -> dict:
+    
+    # Subset per-bond spread terms (leading bond axis) to the active bonds
+    sub = dict(terms)
+    
+    for key, value in terms.items():
+        if key not in ("months", "tenors") and np.ndim(value) and np.shape(value)[0] == bonds:
+            sub[key] = value[index]
+    
+    return sub
+
+
+def duration(settle, cf, curve, spread) -> float:
+    
+    """
+    Macaulay duration (years) at an I-spread.
+    
+    Present values use the monthly equivalent yield at the WAL point, with 
+    the first payment discounted for the days to pay. Modified, effective 
+    and key-rate durations are in the risk module.
+    
+    """
+    
+    terms  = spread_terms(cf, curve, settle, "I")
+    
+    # Solve for monthly equivalent yield
+    mey    = monthly_equiv_yld(settle, cf, curve, spread)
+    months = terms["months"]
+    
+    pv     = terms["flows"]/((1+mey/(12*100))**months)*1/(1+mey/100*terms["days_pay"]/360)
+    years  = months/12 + terms["days_pay"]/360
+    
+    return np.sum(pv*years)/np.sum(pv)
+
+# Unit Testing 
+if __name__ == "__main__":
+    
+    # Get data - curve store built from the local Data folder
+    store = cs.open_store()
+    
+    # I-curve
+    i_curve = store.frame("par", "3/8/2024")
+    
+    # Z-curve
+    z_curve = store.curve("monthly", "3/8/2024")
+    
+    # Cashflows
+    cf_7cpr     = mbs.cash_flow('03/29/2024', 6.50, 360, 360, 240, 0, 54,  7, 'CPR', 1000000)
+    cf_7cpr_wal = mbs.wal('03/29/2024', cf_7cpr)
+    
+    # Getting prices
+    px_i      = price(cf_7cpr, i_curve, "03/29/2024", 172, "I")
+    px_z      = price(cf_7cpr, z_curve, "03/29/2024", 140, "Z")
+    
+    print(px_i)
+    print(px_z)
+    
+    # Spread history - one price per curve date, every date solved at once
+    history = spread_history(cf_7cpr, store.load("monthly"), px_z, dates=store.load("monthly")[0][:60])
+    print(history.tail())
+
+
+
+
+